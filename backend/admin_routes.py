@@ -79,7 +79,9 @@ from database import get_db_connection
 from pgmpy.readwrite.BIF import BIFReader, BIFWriter
 from pgmpy.factors.discrete import TabularCPD
 # Import the new cache management functions
-from prerequisite.prerequisite_api import get_model, clear_model_cache
+from prerequisite.prerequisite_api import get_model, compile_model, network_response, patch_cpds, publish_model, snapshot_model
+from prerequisite.network_store import content_hash, save_network_content
+from prerequisite.network_artifact import build_artifact
 
 admin_routes = Blueprint('admin_routes', __name__)
 
@@ -298,22 +300,24 @@ def get_cpds():
         model_data = get_model(network)
         if not model_data:
             return jsonify({"error": f"BIF file '{network}' not found or failed to load."}), 404
-        
-        model = model_data["model"]
-        cpds = {}
-        for cpd in model.get_cpds():
-            is_singular = not cpd.variables[1:]
-            
-            # For singular nodes, pgmpy might give [[0.7, 0.3]]. Flatten it.
-            # For complex nodes, transpose the values for correct display.
-            values = np.array(cpd.values)
-            processed_values = values.flatten().tolist() if is_singular else values.T.tolist()
-
-            cpds[cpd.variable] = {
-                "values": processed_values,
-                "evidence": cpd.variables[1:]
-            }
-        return jsonify({"cpds": cpds, "message": "CPDs retrieved successfully."})
+
+        def build():
+            cpds = {}
+            for cpd in model_data["model"].get_cpds():
+                is_singular = not cpd.variables[1:]
+
+                # For singular nodes, pgmpy might give [[0.7, 0.3]]. Flatten it.
+                # For complex nodes, transpose the values for correct display.
+                values = np.array(cpd.values)
+                processed_values = values.flatten().tolist() if is_singular else values.T.tolist()
+
+                cpds[cpd.variable] = {
+                    "values": processed_values,
+                    "evidence": cpd.variables[1:]
+                }
+            return jsonify({"cpds": cpds, "message": "CPDs retrieved successfully."})
+
+        return network_response(model_data, "admin_cpds", build)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -389,12 +393,16 @@ def batch_update_cpds():
             model_data = get_model(network)
             if not model_data:
                 # We need a model to apply changes to. If it doesn't exist, create an empty one.
-                from pgmpy.models import BayesianNetwork
-                model = BayesianNetwork()
+                from pgmpy.models import DiscreteBayesianNetwork
+                model = DiscreteBayesianNetwork()
             else:
-                model = model_data["model"]
+                # Copy-on-write: edits go to a private copy, never to the cached model
+                model = snapshot_model(model_data["model"])
 
-            # Apply all changes for this network to the same model object
+            # Apply all changes for this network to the same (private) model object
+            applied = 0
+            updated_cpds = {}
+            structural = model_data is None
             for change in network_changes:
                 if change["type"] == "update":
                     variable = change["variable"]
@@ -409,6 +417,7 @@ def batch_update_cpds():
 
                     if variable not in model.nodes:
                         model.add_node(variable)
+                        structural = True
 
                     if not evidence:
                         if values_np.shape != (2, 1):
@@ -436,6 +445,8 @@ def batch_update_cpds():
                         state_names=cpd_state_names
                     )
                     model.add_cpds(cpd)
+                    updated_cpds[variable] = cpd
+                    applied += 1
                     results.append(f"Queued update for {variable}.")
 
                 elif change["type"] == "delete":
@@ -443,24 +454,36 @@ def batch_update_cpds():
                     # Check if the node actually exists before trying to remove it
                     if variable in model.nodes:
                         model.remove_node(variable) # Use remove_node to clear everything
+                        structural = True
+                        applied += 1
                         results.append(f"Queued delete for {variable}.")
                     else:
                         results.append(f"Skipped delete for {variable} as it was not found in the model.")
 
-            # After all changes for this network are applied, save it
+            if not applied:
+                results.append(f"No valid changes for {network}; nothing saved.")
+                continue
+
+            # CPD-only edits patch the stored text and compiled engine in place
+            if not structural and patch_cpds(network, model_data, list(updated_cpds.values())) is not None:
+                results.append(f"Successfully saved and published {network}.")
+                continue
+
+            # After all changes for this network are applied, validate and compile it, then save it
             model.check_model()
             writer = BIFWriter(model)
             new_content = str(writer)
+            new_model_data = compile_model(network, model, content_hash(new_content), None)
             
             conn = get_db_connection()
             cursor = conn.cursor()
-            cursor.execute("UPDATE bayesian_networks SET content = ? WHERE name = ?", (new_content, network))
+            new_model_data["version"] = save_network_content(cursor, network, new_content, build_artifact(model))
             conn.commit()
             conn.close()
             
-            # --- OPTIMIZATION: Invalidate only the modified network from the cache ---
-            clear_model_cache(network)
-            results.append(f"Successfully saved and cleared cache for {network}.")
+            # Swap the compiled copy into the cache in one step; readers never see a half-edited model
+            publish_model(network, new_model_data)
+            results.append(f"Successfully saved and published {network}.")
 
         except Exception as e:
             results.append(f"Error processing network {network}: {str(e)}")
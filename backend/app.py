@@ -14,7 +14,8 @@ from admin_routes import admin_routes
 
 
 # Import the prerequisite blueprint
-from prerequisite.prerequisite_api import prereq_bp
+from prerequisite.prerequisite_api import prereq_bp, start_cache_warmup, INFERENCE_POOL
+from prerequisite.online_learning import ONLINE_LEARNING, start_count_publisher
 
 app = Flask(__name__)
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
@@ -42,6 +43,22 @@ app.register_blueprint(user_routes, url_prefix='/api/users')
 app.register_blueprint(prereq_bp, url_prefix='/api')  # Register the prerequisite blueprint
 app.register_blueprint(admin_routes, url_prefix='/api/admin')
 
+# Inference pool workers re-import this file as __mp_main__ (spawn start method);
+# only the server process itself starts background work.
+if __name__ != '__mp_main__':
+    # Opt-in: load every Bayesian Network in the background at startup.
+    # /api/health/ready answers 503 until warming is done.
+    if os.environ.get('BN_PREWARM', 'False').lower() == 'true':
+        start_cache_warmup(max_workers=int(os.environ.get('BN_PREWARM_WORKERS', 2)))
+
+    # Opt-in: run inference in worker processes (BN_INFERENCE_PROCESSES > 0).
+    if INFERENCE_POOL is not None:
+        INFERENCE_POOL.start()
+
+    # Opt-in: turn live submissions into CPD updates (BN_ONLINE_LEARNING=true),
+    # published every BN_ONLINE_PUBLISH_SECONDS.
+    if ONLINE_LEARNING:
+        start_count_publisher()
 
 
 #Run the Flask App
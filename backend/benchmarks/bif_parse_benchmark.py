@@ -0,0 +1,55 @@
+"""Compare parse time of the fast BIF parser with pgmpy's BIFReader.
+
+Parses every network in backend/prerequisite/ with both parsers, checks that
+they produce the same model and prints the mean time per parse.
+
+Run from the backend folder:
+    python -m benchmarks.bif_parse_benchmark [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pgmpy.readwrite import BIFReader
+
+from prerequisite.bif_parser import parse_bif
+
+BIF_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'prerequisite')
+
+
+def same_model(a, b):
+    return (
+        list(a.nodes()) == list(b.nodes())
+        and sorted(a.edges()) == sorted(b.edges())
+        and all(a.get_parents(n) == b.get_parents(n) for n in a.nodes())
+        and all(a.get_cpds(n) == b.get_cpds(n) for n in a.nodes() if a.get_cpds(n) is not None)
+    )
+
+
+def mean_seconds(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='parses per network and parser (default: 3)')
+    args = parser.parse_args()
+
+    print(f"{'network':<18}{'BIFReader (ms)':>16}{'parse_bif (ms)':>16}{'speedup':>10}  same model")
+    for filename in sorted(f for f in os.listdir(BIF_FOLDER) if f.endswith('.bif')):
+        with open(os.path.join(BIF_FOLDER, filename)) as f:
+            text = f.read()
+        slow, reference = mean_seconds(lambda: BIFReader(string=text).get_model(), args.repeat)
+        fast, model = mean_seconds(lambda: parse_bif(text), args.repeat)
+        print(f"{filename:<18}{slow * 1000:>16.1f}{fast * 1000:>16.2f}{slow / fast:>9.0f}x  {same_model(reference, model)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Check the compiled inference engines against pgmpy's VariableElimination.
+
+For every network in the database, draws random evidence sets (up to
+--max-evidence observed nodes), asks each engine in INFERENCE_ENGINES for the
+marginals of all other nodes and compares them with VariableElimination, one
+single-node query at a time. It prints the largest absolute difference and the
+mean time per evidence set, and exits with status 1 if an exact engine is off by
+more than --tolerance or an approximate (sampling) one by more than
+--approx-tolerance.
+
+Run from the backend folder (it reads database.db there):
+    python -m benchmarks.engine_parity [--samples N] [--max-evidence K] [--tolerance T] [--approx-tolerance A]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pgmpy.inference import VariableElimination
+
+from database import get_db_connection
+from prerequisite.bif_parser import read_bif
+from prerequisite.prerequisite_api import INFERENCE_ENGINES
+
+
+def random_evidence(model, engine, rng, max_evidence):
+    nodes = list(model.nodes())
+    count = rng.randint(0, min(max_evidence, len(nodes) - 1))
+    return {node: rng.choice(engine.state_names[node]) for node in rng.sample(nodes, count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=50, help='evidence sets per network (default: 50)')
+    parser.add_argument('--max-evidence', type=int, default=3, help='most observed nodes per evidence set (default: 3)')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='largest allowed absolute difference (default: 1e-9)')
+    parser.add_argument('--approx-tolerance', type=float, default=0.05,
+                        help='largest allowed absolute difference of approximate engines (default: 0.05)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    networks = conn.execute("SELECT name, content FROM bayesian_networks ORDER BY name").fetchall()
+    conn.close()
+
+    failed = False
+    header = ''.join(f"{name + ' err':>26}{'ms':>9}" for name in INFERENCE_ENGINES)
+    print(f"{'network':<18}{'nodes':>6}{'VE ms':>9}{header}")
+    for network in networks:
+        try:
+            model = read_bif(network['content'])
+            model.check_model()
+        except Exception as e:
+            print(f"{network['name']:<18}  skipped: {e}")
+            continue
+
+        reference = VariableElimination(model)
+        engines = {name: cls(model) for name, cls in INFERENCE_ENGINES.items()}
+        errors = dict.fromkeys(engines, 0.0)
+        seconds = dict.fromkeys(engines, 0.0)
+        reference_seconds = 0.0
+        queries = 0
+        rng = random.Random(args.seed)
+        for _ in range(args.samples):
+            evidence = random_evidence(model, engines['junction_tree'], rng, args.max_evidence)
+            variables = [node for node in model.nodes() if node not in evidence]
+            try:
+                engines['junction_tree'].query_marginals(variables, evidence)
+            except ValueError:
+                continue  # impossible evidence
+            started = time.perf_counter()
+            expected = {
+                var: reference.query([var], evidence=evidence, show_progress=False).values
+                for var in variables
+            }
+            reference_seconds += time.perf_counter() - started
+            queries += 1
+            for name, engine in engines.items():
+                started = time.perf_counter()
+                marginals = engine.query_marginals(variables, evidence)
+                seconds[name] += time.perf_counter() - started
+                for var in variables:
+                    errors[name] = max(errors[name], float(np.abs(marginals[var] - expected[var]).max()))
+
+        per_query = lambda total: total / max(queries, 1) * 1000
+        row = ''.join(f"{errors[name]:>26.1e}{per_query(seconds[name]):>9.2f}" for name in engines)
+        print(f"{network['name']:<18}{len(model.nodes()):>6}{per_query(reference_seconds):>9.2f}{row}")
+        failed = failed or any(
+            error > (args.tolerance if engines[name].exact else args.approx_tolerance)
+            for name, error in errors.items()
+        )
+
+    if failed:
+        print("❌ Some engine differs from VariableElimination by more than its tolerance.")
+        sys.exit(1)
+    print("✅ All engines match VariableElimination.")
+
+
+if __name__ == '__main__':
+    main()
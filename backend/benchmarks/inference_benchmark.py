@@ -0,0 +1,214 @@
+"""Latency of the inference paths on every network in backend/prerequisite/.
+
+For each network this times:
+  * get_model (cold): database fetch, parse, check and engine build, with
+    the network dropped from the model cache and its stored compiled
+    artifact removed first;
+  * get_model (artifact): the same cold load, but rebuilding the model from
+    the stored artifact as a restarted server does;
+  * determine_next_focus on the cached model, for random failed competencies;
+  * run_manual_query with random scores (about half of them failing);
+  * run_auto_query on stored results;
+  * POST /api/assess through the Flask test client, three items per request.
+It prints p50/p95/p99 latency and throughput per network and operation, and
+writes them with the BN_* settings to a JSON file so runs with different
+engines or settings can be compared.
+
+The benchmark works on a temporary copy of database.db. The assessments and
+results that run_auto_query needs are inserted into that copy only. Model
+cache warm-up and online learning are switched off for the run. The query
+cache stays on, as on the server; set BN_QUERY_CACHE_SIZE=0 to time the
+engines alone.
+
+Run from the backend folder:
+    BN_ENGINE=einsum python -m benchmarks.inference_benchmark [--repeat N] [--cold-repeat N] [--output FILE] [--seed S]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIF_FOLDER = os.path.join(BACKEND, 'prerequisite')
+sys.path.insert(0, BACKEND)
+
+import numpy as np
+
+OPERATIONS = ['get_model_cold', 'get_model_artifact', 'determine_next_focus', 'run_manual_query', 'run_auto_query', 'assess_route']
+
+
+def summarize(seconds, errors):
+    latencies = np.array(seconds) * 1000
+    return {
+        'calls': len(seconds),
+        'errors': errors,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'throughput_per_s': len(seconds) / float(np.sum(seconds)),
+    }
+
+
+def timed(calls, setup=None):
+    """Run each ``call()`` and return the seconds of each and how many reported an error.
+
+    ``setup()``, if given, runs before every call and is not timed.
+    """
+
+    seconds, errors = [], 0
+    for call in calls:
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        failed = call()
+        seconds.append(time.perf_counter() - started)
+        errors += bool(failed)
+    return seconds, errors
+
+
+def insert_results(network, nodes, count, rng):
+    """Store ``count`` results on assessments linked to random ``nodes`` and return their ids."""
+
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    assessment_ids = {}
+    for node in nodes:
+        cursor.execute(
+            "INSERT INTO assessments (title, bif_file, competency_node) VALUES (?, ?, ?)",
+            (f"benchmark {network} {node}", network, node),
+        )
+        assessment_ids[node] = cursor.lastrowid
+    result_ids = []
+    for _ in range(count):
+        cursor.execute(
+            "INSERT INTO student_results (student_id, assessment_id, score, total, attempt_number) VALUES (?, ?, ?, 10, 1)",
+            ('benchmark', assessment_ids[rng.choice(nodes)], rng.randint(0, 10)),
+        )
+        result_ids.append(cursor.lastrowid)
+    conn.commit()
+    conn.close()
+    return result_ids
+
+
+def drop_artifact(network):
+    """Remove ``network``'s stored compiled artifact so the next load parses the BIF."""
+
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    conn.execute("UPDATE bayesian_networks SET compiled = NULL, compiled_hash = NULL WHERE name = ?", (network,))
+    conn.commit()
+    conn.close()
+
+
+def bench_network(network, client, args, rng):
+    from prerequisite.prerequisite_api import clear_model_cache, determine_next_focus, get_model
+    from query_helpers import run_auto_query, run_manual_query
+
+    def load():
+        return get_model(network) is None
+
+    def uncached():
+        clear_model_cache(network)
+
+    def unbuilt():
+        uncached()
+        drop_artifact(network)
+
+    results = {
+        'get_model_cold': summarize(*timed([load] * args.cold_repeat, setup=unbuilt)),
+        'get_model_artifact': summarize(*timed([load] * args.cold_repeat, setup=uncached)),
+    }
+    model_data = get_model(network)
+    graph = model_data['graph']
+    nodes = graph.nodes
+    picks = [rng.choice(nodes) for _ in range(args.repeat)]
+    scores = [rng.randint(0, 10) for _ in range(args.repeat)]
+    result_ids = insert_results(network, nodes, args.repeat, rng)
+
+    results['determine_next_focus'] = summarize(*timed(
+        lambda node=node: 'error' in determine_next_focus(graph, model_data['infer'], node, None, None, 0) for node in picks
+    ))
+    results['run_manual_query'] = summarize(*timed(
+        lambda node=node, score=score: run_manual_query(network, node, score, 10, None, None)[1]
+        for node, score in zip(picks, scores)
+    ))
+    results['run_auto_query'] = summarize(*timed(
+        lambda result_id=result_id: run_auto_query(result_id)[1] for result_id in result_ids
+    ))
+    payloads = [
+        {'tested': [{'competency': rng.choice(nodes), 'score': rng.randint(0, 10)} for _ in range(3)]}
+        for _ in range(args.repeat)
+    ]
+    results['assess_route'] = summarize(*timed(
+        lambda payload=payload: client.post(f'/api/assess?bif={network}', json=payload).status_code != 200
+        for payload in payloads
+    ))
+    return {'nodes': len(nodes), **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help='calls per warm operation and network (default: 200)')
+    parser.add_argument('--cold-repeat', type=int, default=10, help='cold loads per network (default: 10)')
+    parser.add_argument('--output', default='inference_benchmark.json', help='JSON results file (default: inference_benchmark.json)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    os.environ['BN_PREWARM'] = 'False'
+    os.environ['BN_ONLINE_LEARNING'] = 'False'
+    workdir = tempfile.mkdtemp(prefix='bn-benchmark-')
+    shutil.copy(os.path.join(BACKEND, 'database.db'), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with open(os.devnull, 'w') as quiet:
+            with contextlib.redirect_stdout(quiet):
+                from app import app
+                from prerequisite.network_store import fetch_network
+            client = app.test_client()
+
+            report = {
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'settings': {key: value for key, value in sorted(os.environ.items()) if key.startswith('BN_')},
+                'repeat': args.repeat,
+                'cold_repeat': args.cold_repeat,
+                'seed': args.seed,
+                'networks': {},
+            }
+            print(f"{'network':<18}{'operation':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ops/s':>10}{'errors':>8}")
+            for filename in sorted(f for f in os.listdir(BIF_FOLDER) if f.endswith('.bif')):
+                if fetch_network(filename) is None:
+                    print(f"{filename:<18}  skipped: not in the database")
+                    continue
+                with contextlib.redirect_stdout(quiet):
+                    results = bench_network(filename, client, args, random.Random(args.seed))
+                report['networks'][filename] = results
+                for operation in OPERATIONS:
+                    stats = results[operation]
+                    print(f"{filename:<18}{operation:<22}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}"
+                          f"{stats['p99_ms']:>9.2f}{stats['throughput_per_s']:>10.0f}{stats['errors']:>8}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
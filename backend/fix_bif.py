@@ -1,5 +1,7 @@
 import sqlite3
 
+from prerequisite.network_store import save_network_content
+
 DB_PATH = 'database.db'
 BIF_TO_FIX = 'fractions.bif'
 
@@ -260,22 +262,11 @@ def fix_bif_content():
         
         print(f"Attempting to fix '{BIF_TO_FIX}' in the database...")
         
-        cursor.execute(
-            "UPDATE bayesian_networks SET content = ? WHERE name = ?",
-            (VALID_BIF_CONTENT, BIF_TO_FIX)
-        )
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            print(f"✅ Successfully reset content for '{BIF_TO_FIX}'.")
-        else:
-            # If the file wasn't in the DB, insert it.
-            cursor.execute(
-                "INSERT OR IGNORE INTO bayesian_networks (name, content) VALUES (?, ?)",
-                (BIF_TO_FIX, VALID_BIF_CONTENT)
-            )
-            conn.commit()
-            print(f"✅ Successfully inserted content for '{BIF_TO_FIX}'.")
+        # Goes through the shared helper so the network's version is bumped and
+        # running workers reload it.
+        save_network_content(cursor, BIF_TO_FIX, VALID_BIF_CONTENT)
+        conn.commit()
+        print(f"✅ Successfully saved content for '{BIF_TO_FIX}'.")
             
         conn.close()
         
@@ -284,4 +275,4 @@ def fix_bif_content():
 
 if __name__ == "__main__":
     fix_bif_content()
-    print("\nPlease restart your backend server to load the corrected network.")
+    print("\nRunning backend workers will reload the corrected network on their next version check.")
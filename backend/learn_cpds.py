@@ -0,0 +1,60 @@
+"""Offline job: learn the CPDs of the networks from the recorded assessment results.
+
+Streams student_results joined to assessments.competency_node, turns each score
+into pass/fail evidence and fits every network with EM (see
+prerequisite/cpd_learning.py). Networks are independent, so they are fitted in
+parallel worker processes. Each learned network is saved as a new version, and
+running servers reload it on their next version check.
+
+Run from the backend folder:
+    python learn_cpds.py [network.bif ...] [--workers N] [--prior-weight W] [--dry-run]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from database import get_db_connection
+from prerequisite.cpd_learning import PASS_RATIO, learn_network, linked_networks
+from prerequisite.network_store import ensure_network_columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('networks', nargs='*', help='networks to learn (default: every network with linked assessments)')
+    parser.add_argument('--workers', type=int, default=2, help='networks fitted in parallel (default: 2)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='result rows fetched per chunk (default: 10000)')
+    parser.add_argument('--pass-ratio', type=float, default=PASS_RATIO, help=f'score/total counted as a pass (default: {PASS_RATIO})')
+    parser.add_argument('--prior-weight', type=float, default=10.0,
+                        help='pseudo-cases per parent configuration backing the current CPDs (default: 10)')
+    parser.add_argument('--max-iter', type=int, default=50, help='most EM iterations (default: 50)')
+    parser.add_argument('--tol', type=float, default=1e-4, help='stop when no parameter moves more than this (default: 1e-4)')
+    parser.add_argument('--min-cases', type=int, default=1, help='leave networks with fewer students unchanged (default: 1)')
+    parser.add_argument('--dry-run', action='store_true', help='fit and report, but save nothing')
+    args = parser.parse_args()
+
+    # Migrate the table once here, not concurrently in every worker
+    conn = get_db_connection()
+    ensure_network_columns(conn.cursor())
+    conn.close()
+
+    networks = args.networks or linked_networks()
+    options = dict(
+        chunk_size=args.chunk_size, pass_ratio=args.pass_ratio, prior_weight=args.prior_weight,
+        max_iter=args.max_iter, tol=args.tol, min_cases=args.min_cases, dry_run=args.dry_run,
+    )
+    print(f"--- Learning CPDs of {len(networks)} network(s) with {args.workers} worker(s) ---")
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {network: pool.submit(learn_network, network, **options) for network in networks}
+        for network, future in futures.items():
+            try:
+                summary = future.result()
+            except Exception as e:
+                print(f"❌ {network}: {e}")
+                continue
+            icon = "✅" if summary["version"] is not None else "ℹ️"
+            details = ", ".join(f"{key}={value}" for key, value in summary.items() if key not in ("network", "status"))
+            print(f"{icon} {network}: {summary['status']} ({details})")
+
+
+if __name__ == '__main__':
+    main()
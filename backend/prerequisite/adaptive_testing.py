@@ -0,0 +1,93 @@
+"""Adaptive testing: pick the assessment that is expected to teach us the most.
+
+Given the evidence recorded for a student so far, every untested competency
+``c`` is scored by its expected information gain:
+
+    H(e) - sum_s P(c = s | e) · H(e, c = s)
+
+``H(·)`` is the summed entropy of the mastery posteriors of every unobserved
+node in the network, in bits. All the posteriors this needs come from one
+``batch_marginals`` call: one row holds the current evidence, and one row per
+candidate state adds ``c = s`` to it. On the vectorized engines that call is a
+single contraction, so the next item can be chosen between two questions.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from database import get_db_connection
+
+
+def fetch_assessments_by_node(bif_file: str) -> Dict[str, Dict]:
+    """``{competency node: {"assessment_id", "title"}}`` of the assessments linked to ``bif_file``."""
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT id, title, competency_node FROM assessments "
+            "WHERE bif_file = ? AND competency_node IS NOT NULL AND competency_node != '' ORDER BY id",
+            (bif_file,),
+        ).fetchall()
+    finally:
+        conn.close()
+    assessments: Dict[str, Dict] = {}
+    for row in rows:
+        assessments.setdefault(row["competency_node"], {"assessment_id": row["id"], "title": row["title"]})
+    return assessments
+
+
+def _entropy(marginals: Dict[str, np.ndarray]) -> np.ndarray:
+    """Summed entropy (bits) of each row of ``{variable: (rows, card)}`` posteriors."""
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return sum(-np.where(values > 0, values * np.log2(values), 0.0).sum(axis=1) for values in marginals.values())
+
+
+def rank_by_information_gain(infer, variables: List[str], evidence: Dict[str, str],
+                             candidates: Optional[Iterable[str]] = None) -> Dict:
+    """Score unobserved ``candidates`` (default: all unobserved ``variables``) by expected information gain.
+
+    ``infer`` is any engine stack with ``batch_marginals`` and ``state_names``.
+    Returns the current ``entropy`` and the ``ranking``, a list of
+    ``{"competency", "expected_information_gain", "mastery_probability"}``
+    sorted best first. Raises ``ValueError`` if ``evidence`` is impossible.
+    """
+
+    unobserved = [var for var in variables if var not in evidence]
+    pool = unobserved if candidates is None else [var for var in candidates if var in unobserved]
+    if not unobserved:
+        return {"entropy": 0.0, "ranking": []}
+
+    rows: List[Dict[str, str]] = [dict(evidence)]
+    owners = []
+    for var in pool:
+        for state in infer.state_names[var]:
+            rows.append({**evidence, var: state})
+            owners.append(var)
+
+    marginals = infer.batch_marginals(unobserved, rows)
+    if np.isnan(marginals[unobserved[0]][0, 0]):
+        raise ValueError(f"Evidence {evidence} has zero probability under the model")
+    entropy = _entropy(marginals)
+
+    current = {var: marginals[var][0] for var in unobserved}
+    expected = dict.fromkeys(pool, 0.0)
+    for row, var in enumerate(owners, start=1):
+        state = infer.state_names[var].index(rows[row][var])
+        weight = current[var][state]
+        if weight > 0:
+            expected[var] += weight * entropy[row]
+
+    ranking = [
+        {
+            "competency": var,
+            "expected_information_gain": float(entropy[0] - expected[var]),
+            "mastery_probability": float(current[var][1]),
+        }
+        for var in pool
+    ]
+    ranking.sort(key=lambda item: item["expected_information_gain"], reverse=True)
+    return {"entropy": float(entropy[0]), "ranking": ranking}
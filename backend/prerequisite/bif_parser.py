@@ -0,0 +1,281 @@
+"""Fast parser for the subset of BIF that this project writes.
+
+Our networks only use discrete variables, ``table`` entries and
+parent-conditioned rows such as ``(0, 1) 0.55, 0.45;``, either hand-written or
+with the quoted names that ``BIFWriter`` produces. ``parse_bif`` reads
+that subset with a single regex tokenizer pass and builds the same model as
+pgmpy's ``BIFReader``. ``read_bif`` falls back to ``BIFReader`` for anything
+the fast parser does not understand.
+
+``replace_probability_blocks`` goes the other way for CPD edits: it rewrites
+only the ``probability`` blocks of the edited nodes and leaves the rest of the
+text byte for byte as it was.
+"""
+
+from __future__ import annotations
+
+import re
+from itertools import product
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+from pgmpy.models import DiscreteBayesianNetwork
+
+# Comments are skipped; quoted names (as BIFWriter writes them) lose their quotes.
+_TOKEN = re.compile(r'//[^\n]*|/\*.*?\*/|([{}()\[\];,|])|"([^"]*)"|([^\s{}()\[\];,|"]+)', re.S)
+_BARE_NAME = re.compile(r'[^\s{}()\[\];,|"]+')
+
+
+class UnsupportedBIF(ValueError):
+    """The text uses BIF features outside the subset ``parse_bif`` handles."""
+
+
+class _Tokens:
+    def __init__(self, text: str) -> None:
+        self.items = [
+            m.group(1) or m.group(2) or m.group(3)
+            for m in _TOKEN.finditer(text)
+            if m.group(1) or m.group(2) is not None or m.group(3)
+        ]
+        self.pos = 0
+
+    def peek(self):
+        return self.items[self.pos] if self.pos < len(self.items) else None
+
+    def next(self) -> str:
+        if self.pos >= len(self.items):
+            raise UnsupportedBIF("Unexpected end of BIF text")
+        token = self.items[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, expected: str) -> None:
+        token = self.next()
+        if token != expected:
+            raise UnsupportedBIF(f"Expected '{expected}' but found '{token}'")
+
+    def skip_block(self) -> None:
+        """Skip a ``{ ... }`` block, including nested braces."""
+
+        self.expect("{")
+        depth = 1
+        while depth:
+            token = self.next()
+            depth += token == "{"
+            depth -= token == "}"
+
+    def skip_statement(self) -> None:
+        while self.next() != ";":
+            pass
+
+    def names_until(self, closing: str) -> List[str]:
+        """Read ``a, b, c`` up to ``closing``."""
+
+        names = []
+        while True:
+            token = self.next()
+            if token == closing and not names:
+                return names
+            names.append(token)
+            token = self.next()
+            if token == closing:
+                return names
+            if token != ",":
+                raise UnsupportedBIF(f"Expected ',' or '{closing}' but found '{token}'")
+
+    def numbers_until_semicolon(self) -> List[float]:
+        try:
+            return [float(v) for v in self.names_until(";")]
+        except ValueError as e:
+            raise UnsupportedBIF(f"Non-numeric probability: {e}")
+
+
+def _parse_variable(tokens: _Tokens) -> Tuple[str, List[str]]:
+    name = tokens.next()
+    tokens.expect("{")
+    tokens.expect("type")
+    tokens.expect("discrete")
+    tokens.expect("[")
+    try:
+        card = int(tokens.next())
+    except ValueError:
+        raise UnsupportedBIF(f"Invalid cardinality for '{name}'")
+    tokens.expect("]")
+    tokens.expect("{")
+    states = tokens.names_until("}")
+    tokens.expect(";")
+    if len(states) != card:
+        raise UnsupportedBIF(f"'{name}' declares {card} states but lists {len(states)}")
+    while tokens.peek() == "property":
+        tokens.skip_statement()
+    tokens.expect("}")
+    return name, states
+
+
+def _parse_probability(tokens: _Tokens, states: Dict[str, List[str]]) -> Tuple[str, List[str], np.ndarray]:
+    tokens.expect("(")
+    var = tokens.next()
+    parents: List[str] = []
+    token = tokens.next()
+    if token == "|":
+        parents = tokens.names_until(")")
+    elif token != ")":
+        raise UnsupportedBIF(f"Unexpected '{token}' in probability header of '{var}'")
+    for name in [var] + parents:
+        if name not in states:
+            raise UnsupportedBIF(f"Probability references undeclared variable '{name}'")
+
+    card = len(states[var])
+    combos = list(product(*[states[p] for p in parents]))
+    table = None
+    rows: Dict[Tuple[str, ...], List[float]] = {}
+    tokens.expect("{")
+    while True:
+        token = tokens.next()
+        if token == "}":
+            break
+        if token == "table":
+            table = tokens.numbers_until_semicolon()
+        elif token == "(":
+            key = tuple(tokens.names_until(")"))
+            rows[key] = tokens.numbers_until_semicolon()
+        elif token == "property":
+            tokens.skip_statement()
+        else:
+            raise UnsupportedBIF(f"Unsupported probability entry '{token}' for '{var}'")
+
+    if table is not None and not rows:
+        if len(table) != card * len(combos):
+            raise UnsupportedBIF(f"Table for '{var}' has {len(table)} values, expected {card * len(combos)}")
+        return var, parents, np.array(table).reshape(card, len(combos))
+    if table is None and parents and len(rows) == len(combos):
+        values = np.zeros((card, len(combos)))
+        for index, combination in enumerate(combos):
+            row = rows.get(combination)
+            if row is None or len(row) != card:
+                raise UnsupportedBIF(f"Missing or malformed row {combination} for '{var}'")
+            values[:, index] = row
+        return var, parents, values
+    raise UnsupportedBIF(f"Incomplete probability block for '{var}'")
+
+
+def parse_bif(text: str) -> DiscreteBayesianNetwork:
+    """Parse BIF ``text`` into a model, raising ``UnsupportedBIF`` outside our subset."""
+
+    tokens = _Tokens(text)
+    network_name = None
+    states: Dict[str, List[str]] = {}
+    cpds: Dict[str, Tuple[List[str], np.ndarray]] = {}
+    while tokens.peek() is not None:
+        keyword = tokens.next()
+        if keyword == "network":
+            network_name = tokens.next()
+            tokens.skip_block()
+        elif keyword == "variable":
+            name, var_states = _parse_variable(tokens)
+            states[name] = var_states
+        elif keyword == "probability":
+            var, parents, values = _parse_probability(tokens, states)
+            cpds[var] = (parents, values)
+        else:
+            raise UnsupportedBIF(f"Unsupported top-level keyword '{keyword}'")
+
+    model = DiscreteBayesianNetwork()
+    model.add_nodes_from(states)
+    model.add_edges_from((parent, var) for var, (parents, _) in cpds.items() for parent in parents)
+    if network_name is not None:
+        model.name = network_name
+    model.add_cpds(*[
+        TabularCPD(
+            var,
+            len(states[var]),
+            values,
+            evidence=parents,
+            evidence_card=[len(states[p]) for p in parents],
+            state_names={name: list(states[name]) for name in parents + [var]},
+        )
+        for var, (parents, values) in sorted(cpds.items())
+    ])
+    return model
+
+
+def read_bif(text: str) -> DiscreteBayesianNetwork:
+    """Parse with ``parse_bif``, falling back to pgmpy's ``BIFReader``."""
+
+    try:
+        return parse_bif(text)
+    except UnsupportedBIF as e:
+        print(f"Fast BIF parser fell back to BIFReader: {e}")
+        from pgmpy.readwrite import BIFReader
+        return BIFReader(string=text).get_model()
+
+
+def _bif_name(name) -> str:
+    name = str(name)
+    return name if _BARE_NAME.fullmatch(name) else f'"{name}"'
+
+
+def format_probability_block(cpd: TabularCPD) -> str:
+    """BIF ``probability`` block of ``cpd`` in the layout ``BIFWriter`` uses."""
+
+    variable, parents = cpd.variable, list(cpd.variables[1:])
+    header = _bif_name(variable) + (" | " + ", ".join(_bif_name(p) for p in parents) if parents else "")
+    values = np.asarray(cpd.values, dtype=float).reshape(cpd.variable_card, -1)
+    if not parents:
+        return f"probability ( {header} ) {{\n    table {', '.join(repr(float(v)) for v in values[:, 0])} ;\n}}"
+    combos = product(*[cpd.state_names[p] for p in parents])
+    rows = [
+        f"    ( {', '.join(_bif_name(s) for s in combo)} ) {', '.join(repr(float(v)) for v in values[:, column])};"
+        for column, combo in enumerate(combos)
+    ]
+    return f"probability ( {header} ) {{\n" + "\n".join(rows) + "\n}"
+
+
+def _probability_spans(text: str) -> Dict[str, Tuple[int, int]]:
+    """``{variable: (start, end)}`` character spans of the top-level ``probability`` blocks."""
+
+    spans: Dict[str, Tuple[int, int]] = {}
+    matches = [m for m in _TOKEN.finditer(text) if m.group(1) or m.group(2) is not None or m.group(3)]
+    depth = 0
+    i = 0
+    while i < len(matches):
+        m = matches[i]
+        token = m.group(1) or m.group(2) or m.group(3)
+        if depth == 0 and token == "probability" and m.group(3) and i + 2 < len(matches) and matches[i + 1].group(1) == "(":
+            name = matches[i + 2].group(2) if matches[i + 2].group(2) is not None else matches[i + 2].group(3)
+            j = i + 1
+            while j < len(matches) and matches[j].group(1) != "{":
+                j += 1
+            block_depth = 0
+            for k in range(j, len(matches)):
+                block_depth += matches[k].group(1) == "{"
+                block_depth -= matches[k].group(1) == "}"
+                if block_depth == 0:
+                    spans[name] = (m.start(), matches[k].end())
+                    break
+            else:
+                raise UnsupportedBIF(f"Unterminated probability block for '{name}'")
+            i = k + 1
+            continue
+        depth += token == "{" and m.group(1) is not None
+        depth -= token == "}" and m.group(1) is not None
+        i += 1
+    return spans
+
+
+def replace_probability_blocks(text: str, cpds: Iterable[TabularCPD]) -> str:
+    """Return ``text`` with the ``probability`` block of each CPD's variable rewritten from the CPD.
+
+    Raises ``UnsupportedBIF`` if a variable has no block to replace.
+    """
+
+    spans = _probability_spans(text)
+    edits = []
+    for cpd in cpds:
+        if cpd.variable not in spans:
+            raise UnsupportedBIF(f"No probability block for '{cpd.variable}'")
+        edits.append((spans[cpd.variable], format_probability_block(cpd)))
+    for (start, end), block in sorted(edits, reverse=True):
+        text = text[:start] + block + text[end:]
+    return text
@@ -0,0 +1,208 @@
+"""Learn a network's CPDs from the assessment results on record.
+
+Every ``student_results`` row of an assessment that is linked to a competency
+node (``assessments.competency_node``) becomes one observation of that node:
+state ``'1'`` when the student scored at least ``PASS_RATIO`` of the total,
+``'0'`` otherwise. A student's latest attempt per node wins. The student's
+observations on one network form one case.
+
+Cases are streamed from the database in chunks, ordered by student, and only
+the counts of distinct evidence patterns are kept. Memory therefore grows with
+the number of patterns, not the number of result rows.
+
+``fit_cpds`` runs EM over those patterns. Each E-step takes the expected
+family counts ``P(node, parents | case)`` of every pattern from one
+junction-tree propagation. Nodes that are never assessed are thus learned from
+their observed relatives. The M-step is a Bayesian (Dirichlet) estimate whose
+prior is the current CPD weighted by ``prior_weight`` pseudo-cases per parent
+configuration, so sparse data only nudges the hand-set tables. When every case
+observes every node, the first iteration is already the exact posterior-mean
+estimate.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+
+from database import get_db_connection
+from prerequisite.bif_parser import read_bif, replace_probability_blocks
+from prerequisite.junction_tree import JunctionTreeEngine
+from prerequisite.network_artifact import build_artifact
+from prerequisite.network_store import fetch_network, patch_network_content
+from prerequisite.student_profile import MASTERED_STATE, NOT_MASTERED_STATE
+
+# Share of the total score that counts as a pass, as in the manual query.
+PASS_RATIO = 0.7
+
+
+def linked_networks() -> List[str]:
+    """Networks with at least one assessment linked to a competency node."""
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT bif_file FROM assessments "
+            "WHERE bif_file IS NOT NULL AND bif_file != '' AND competency_node IS NOT NULL AND competency_node != '' "
+            "ORDER BY bif_file"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row["bif_file"] for row in rows]
+
+
+def iter_cases(bif_file: str, chunk_size: int = 10000, pass_ratio: float = PASS_RATIO) -> Iterator[Dict[str, str]]:
+    """Yield one ``{node: state}`` case per student with results on ``bif_file``.
+
+    Rows are fetched ``chunk_size`` at a time, ordered by student and attempt,
+    so only the current student's case is held in memory.
+    """
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT sr.student_id, a.competency_node, sr.score, sr.total FROM student_results sr "
+            "JOIN assessments a ON a.id = sr.assessment_id "
+            "WHERE a.bif_file = ? AND a.competency_node IS NOT NULL AND a.competency_node != '' "
+            "ORDER BY sr.student_id, sr.attempt_number, sr.id",
+            (bif_file,),
+        )
+        student, case = None, {}
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                if row["student_id"] != student:
+                    if case:
+                        yield case
+                    student, case = row["student_id"], {}
+                if not row["total"] or row["total"] <= 0:
+                    continue
+                passed = row["score"] / row["total"] >= pass_ratio
+                case[row["competency_node"]] = MASTERED_STATE if passed else NOT_MASTERED_STATE
+        if case:
+            yield case
+    finally:
+        conn.close()
+
+
+def count_patterns(cases, nodes) -> Tuple[Counter, int]:
+    """Count the distinct evidence patterns of ``cases`` restricted to ``nodes``.
+
+    Returns the ``Counter`` and how many cases had no observation on ``nodes``.
+    """
+
+    nodes = set(nodes)
+    patterns: Counter = Counter()
+    empty = 0
+    for case in cases:
+        pattern = tuple(sorted((node, state) for node, state in case.items() if node in nodes))
+        if pattern:
+            patterns[pattern] += 1
+        else:
+            empty += 1
+    return patterns, empty
+
+
+def fit_cpds(model, patterns: Counter, prior_weight: float = 10.0, max_iter: int = 50,
+             tol: float = 1e-4) -> Tuple[List[TabularCPD], Dict]:
+    """EM estimate of every CPD of ``model`` from weighted evidence ``patterns``.
+
+    Returns the new CPDs (same variables, parent order and state names as
+    ``model``'s) and a summary with the ``iterations`` run, the final
+    ``max_change`` of any parameter, the number of ``cases`` used and the
+    ``skipped`` cases whose evidence was impossible under the model.
+    """
+
+    current = {cpd.variable: cpd for cpd in model.get_cpds()}
+    shapes = {var: [cpd.variable_card, *cpd.cardinality[1:]] for var, cpd in current.items()}
+    prior = {var: prior_weight * np.asarray(cpd.values, dtype=float).reshape(shapes[var]) for var, cpd in current.items()}
+    observes_all = all(len(pattern) == len(current) for pattern in patterns)
+
+    engine = JunctionTreeEngine(model)
+    fitted = model
+    iterations, max_change, used, skipped = 0, 0.0, 0, 0
+    for iterations in range(1, max_iter + 1):
+        counts = {var: values.copy() for var, values in prior.items()}
+        used = skipped = 0
+        for pattern, weight in patterns.items():
+            try:
+                families = engine.family_marginals(dict(pattern))
+            except ValueError:
+                skipped += weight
+                continue
+            used += weight
+            for var, values in families.items():
+                counts[var] += weight * values
+
+        cpds = []
+        max_change = 0.0
+        for var, cpd in current.items():
+            totals = counts[var].sum(axis=0, keepdims=True)
+            values = np.where(totals > 0, counts[var] / np.where(totals > 0, totals, 1.0), 1.0 / cpd.variable_card)
+            values = values.reshape(cpd.variable_card, -1)
+            max_change = max(max_change, float(np.abs(values - fitted.get_cpds(var).values.reshape(values.shape)).max()))
+            cpds.append(TabularCPD(
+                var,
+                cpd.variable_card,
+                values,
+                evidence=list(cpd.variables[1:]) or None,
+                evidence_card=list(cpd.cardinality[1:]) or None,
+                state_names={v: list(cpd.state_names[v]) for v in cpd.variables},
+            ))
+
+        fitted = fitted.copy()
+        fitted.remove_cpds(*fitted.get_cpds())
+        fitted.add_cpds(*cpds)
+        engine = engine.with_cpds(fitted, list(current))
+        if observes_all or max_change < tol:
+            break
+
+    return cpds, {"iterations": iterations, "max_change": max_change, "cases": used, "skipped": skipped}
+
+
+def learn_network(bif_file: str, chunk_size: int = 10000, pass_ratio: float = PASS_RATIO, prior_weight: float = 10.0,
+                  max_iter: int = 50, tol: float = 1e-4, min_cases: int = 1, dry_run: bool = False) -> Dict:
+    """Fit ``bif_file`` from its results and save it as a new version.
+
+    The learned tables replace only the ``probability`` blocks of the stored
+    text, and the save is refused if the network was edited while fitting.
+    Running servers pick the new version up through their version check.
+    Returns a summary of the fit, with the saved ``version`` (``None`` if
+    nothing was saved) and a ``status`` message.
+    """
+
+    network = fetch_network(bif_file)
+    if network is None:
+        return {"network": bif_file, "version": None, "status": "not in the database"}
+    model = read_bif(network["content"])
+    model.check_model()
+
+    patterns, empty = count_patterns(iter_cases(bif_file, chunk_size, pass_ratio), model.nodes())
+    summary = {"network": bif_file, "patterns": len(patterns), "cases_without_evidence": empty, "version": None}
+    if sum(patterns.values()) < min_cases:
+        return {**summary, "cases": sum(patterns.values()), "status": f"fewer than {min_cases} cases, left unchanged"}
+
+    cpds, fit = fit_cpds(model, patterns, prior_weight, max_iter, tol)
+    summary.update(fit)
+    if dry_run:
+        return {**summary, "status": "dry run, not saved"}
+
+    model.remove_cpds(*model.get_cpds())
+    model.add_cpds(*cpds)
+    model.check_model()
+    content = replace_probability_blocks(network["content"], cpds)
+
+    conn = get_db_connection()
+    try:
+        version = patch_network_content(conn.cursor(), bif_file, network["content_hash"], content, build_artifact(model))
+        conn.commit()
+    finally:
+        conn.close()
+    if version is None:
+        return {**summary, "status": "edited while fitting, not saved"}
+    return {**summary, "version": version, "status": "saved"}
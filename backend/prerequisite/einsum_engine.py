@@ -0,0 +1,176 @@
+"""Vectorized einsum inference for the (binary) prerequisite networks.
+
+Every competency node has two states, and a network has a few dozen nodes, so
+the probability of an evidence assignment is a single tensor contraction over
+the CPD tables. ``EinsumEngine`` keeps each CPD as a contiguous ``float64``
+array. Evidence enters as one indicator vector per variable, all ones when the
+variable is unobserved. The contraction of every CPD with every indicator
+gives ``P(e)``.
+
+The indicators carry a leading batch axis. A marginal ``P(q | e)`` becomes one
+batch row per state of ``q``, each with ``q``'s indicator narrowed to that
+state. All marginals of a query, or of many students' evidence
+(``batch_marginals``), are therefore a single contraction. Its equation never
+changes, so its contraction path is fixed once at load time. The path is
+bucket elimination in the junction tree's min-fill order, which keeps every
+intermediate within the network's treewidth. ``opt_einsum``'s generic path
+search does not: it builds tensors of a dozen or more variables on
+``operations.bif``. The CPD-only intermediate products are evaluated once as
+constants.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import opt_einsum
+
+from prerequisite.engine_base import InferenceEngine
+from prerequisite.junction_tree import min_fill_elimination
+
+# Upper bound on expanded batch rows per contraction, which keeps the
+# intermediates of large cohort queries at a few tens of MB.
+_MAX_BATCH_ROWS = 8192
+
+
+def elimination_path(terms: Sequence[str], order: Sequence[str]) -> List[Tuple[int, int]]:
+    """Pairwise ``opt_einsum`` path that sums out the symbols of ``order`` one by one.
+
+    The operands holding the next symbol are multiplied together, and the last
+    product sums that symbol away. When every symbol is gone, the remaining
+    operands (which only share output symbols) are multiplied together.
+    """
+
+    current = [set(term) for term in terms]
+    path: List[Tuple[int, int]] = []
+
+    def merge(a: int, b: int) -> None:
+        path.append((a, b))
+        merged = current[a] | current[b]
+        for k in sorted((a, b), reverse=True):
+            del current[k]
+        current.append(merged)
+
+    for symbol in order:
+        holding = [k for k, term in enumerate(current) if symbol in term]
+        while len(holding) > 1:
+            merge(holding[0], holding[1])
+            holding = [k for k, term in enumerate(current) if symbol in term]
+        for k in holding:
+            current[k].discard(symbol)
+    while len(current) > 1:
+        merge(0, 1)
+    return path
+
+
+class EinsumEngine(InferenceEngine):
+    """Answer ``query_marginals`` with one precompiled ``opt_einsum`` expression."""
+
+    def __init__(self, model) -> None:
+        super().__init__(model)
+        self.index: Dict[str, int] = {v: i for i, v in enumerate(self.variables)}
+        self.width = max(self.cardinality.values(), default=1)
+
+        self.factors: List[np.ndarray] = []
+        self._terms: List[str] = []
+        symbols = [opt_einsum.get_symbol(i) for i in range(len(self.variables))]
+        self._batch = opt_einsum.get_symbol(len(self.variables))
+        for var in self.variables:
+            cpd = model.get_cpds(var)
+            self.factors.append(self._factor(cpd))
+            self._terms.append("".join(symbols[self.index[v]] for v in cpd.variables))
+        self._terms.extend(self._batch + symbols[i] for i in range(len(self.variables)))
+
+        order = [symbols[self.index[v]] for v, _ in min_fill_elimination(model, self.variables)]
+        self._path = elimination_path(self._terms, order)
+        self._compile()
+
+    def _factor(self, cpd) -> np.ndarray:
+        shape = [self.cardinality[v] for v in cpd.variables]
+        return np.ascontiguousarray(np.asarray(cpd.values, dtype=np.float64).reshape(shape))
+
+    def _compile(self) -> None:
+        """Build the contraction with the current ``factors`` as constants."""
+
+        self._expression = opt_einsum.contract_expression(
+            f"{','.join(self._terms)}->{self._batch}",
+            *self.factors,
+            *[(1, self.cardinality[v]) for v in self.variables],
+            constants=list(range(len(self.factors))),
+            optimize=self._path,
+        )
+        self._prior_marginals = {
+            var: values[0] for var, values in self._contract(self.variables, self._indicators(1)).items()
+        }
+
+    def with_cpds(self, model, variables: Iterable[str]) -> "EinsumEngine":
+        """Swap the edited CPD arrays in and rebuild the expression along the same path."""
+
+        patched = copy.copy(self)
+        patched.model = model
+        patched._fallback = None
+        patched.factors = list(self.factors)
+        for var in variables:
+            patched.factors[self.index[var]] = patched._factor(model.get_cpds(var))
+        patched._compile()
+        return patched
+
+    def _indicators(self, count: int) -> np.ndarray:
+        """``(count, n_variables, width)`` block of all-ones evidence indicators."""
+
+        return np.ones((count, len(self.variables), self.width))
+
+    def _observe(self, indicators: np.ndarray, row: int, indices: Dict[str, int]) -> None:
+        for var, state in indices.items():
+            i = self.index[var]
+            indicators[row, i, :] = 0.0
+            indicators[row, i, state] = 1.0
+
+    def _contract(self, variables: Sequence[str], indicators: np.ndarray) -> Dict[str, np.ndarray]:
+        """Normalized ``(batch, card)`` posteriors; rows of impossible evidence are ``NaN``."""
+
+        count, width = len(indicators), self.width
+        rows = np.repeat(indicators[:, None, None], len(variables) * width, axis=1)
+        rows = rows.reshape(count, len(variables), width, len(self.variables), width)
+        for j, var in enumerate(variables):
+            rows[:, j, :, self.index[var], :] *= np.eye(width)
+        rows = rows.reshape(-1, len(self.variables), width)
+
+        operands = [rows[:, i, :self.cardinality[v]] for i, v in enumerate(self.variables)]
+        joint = self._expression(*operands).reshape(count, len(variables), width)
+        totals = joint.sum(axis=2, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            posterior = np.where(totals > 0, joint / totals, np.nan)
+        return {var: posterior[:, j, :self.cardinality[var]] for j, var in enumerate(variables)}
+
+    def query_marginals(self, variables: Iterable[str], evidence: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """Return ``{variable: posterior array}`` from one batched contraction."""
+
+        variables = list(variables)
+        indices = self.evidence_indices(evidence)
+        self._check_query(variables, indices)
+        if not indices:
+            return {var: self._prior_marginals[var] for var in variables}
+
+        indicators = self._indicators(1)
+        self._observe(indicators, 0, indices)
+        marginals = self._contract(variables, indicators)
+        if variables and np.isnan(marginals[variables[0]][0, 0]):
+            raise ValueError(f"Evidence {evidence} has zero probability under the model")
+        return {var: values[0] for var, values in marginals.items()}
+
+    def batch_marginals(self, variables: Iterable[str], evidence_rows: Sequence[Optional[Dict]]) -> Dict[str, np.ndarray]:
+        """Vectorized ``InferenceEngine.batch_marginals``: every row in one contraction."""
+
+        variables = list(variables)
+        self._check_query(variables, {})
+        indicators = self._indicators(len(evidence_rows))
+        for row, evidence in enumerate(evidence_rows):
+            self._observe(indicators, row, self.evidence_indices(evidence))
+        step = max(1, _MAX_BATCH_ROWS // max(1, len(variables) * self.width))
+        if len(evidence_rows) <= step:
+            return self._contract(variables, indicators)
+        chunks = [self._contract(variables, indicators[start:start + step]) for start in range(0, len(evidence_rows), step)]
+        return {var: np.concatenate([chunk[var] for chunk in chunks]) for var in variables}
@@ -0,0 +1,129 @@
+"""Shared plumbing of the compiled inference engines.
+
+Every engine that can sit in ``get_model``'s ``infer`` slot answers
+``query_marginals(variables, evidence)`` with ``{variable: posterior array}``.
+``InferenceEngine`` holds the variable metadata they all need, resolves
+``{variable: state name}`` evidence to state indices and provides the
+pgmpy-style ``query`` and a row-by-row ``batch_marginals`` built on top of
+``query_marginals``. ``with_cpds`` derives the engine of an edited copy of
+the model; engines that can patch their compiled form in place of a full
+rebuild override it.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pgmpy.factors.discrete import DiscreteFactor
+
+
+class InferenceEngine:
+    """Base class: subclasses implement ``query_marginals``."""
+
+    # False for engines whose answers are estimates (see ``sampling_engine``).
+    exact = True
+
+    def __init__(self, model) -> None:
+        self.model = model
+        self.variables: List[str] = list(model.nodes())
+        self.cardinality: Dict[str, int] = {v: int(model.get_cardinality(v)) for v in self.variables}
+        self.state_names: Dict[str, List] = {}
+        for cpd in model.get_cpds():
+            names = cpd.state_names.get(cpd.variable)
+            self.state_names[cpd.variable] = list(names) if names else list(range(self.cardinality[cpd.variable]))
+        self._state_index = {v: {s: i for i, s in enumerate(names)} for v, names in self.state_names.items()}
+        self._fallback = None
+
+    def evidence_indices(self, evidence: Optional[Dict]) -> Dict[str, int]:
+        """Map ``{variable: state name}`` evidence to ``{variable: state index}``."""
+
+        indices: Dict[str, int] = {}
+        for var, state in (evidence or {}).items():
+            if var not in self._state_index:
+                raise ValueError(f"Evidence variable '{var}' is not in the model")
+            lookup = self._state_index[var]
+            if state in lookup:
+                indices[var] = lookup[state]
+            elif str(state) in lookup:
+                indices[var] = lookup[str(state)]
+            else:
+                raise ValueError(f"State '{state}' is not a valid state of '{var}'")
+        return indices
+
+    def _check_query(self, variables: List[str], indices: Dict[str, int]) -> None:
+        for var in variables:
+            if var not in self.cardinality:
+                raise ValueError(f"Query variable '{var}' is not in the model")
+        overlap = set(variables) & set(indices)
+        if overlap:
+            raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. Found in both: {overlap}")
+
+    def query_marginals(self, variables: Iterable[str], evidence: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def with_cpds(self, model, variables: Iterable[str]) -> "InferenceEngine":
+        """Engine for ``model``, which differs from ``self.model`` only in the CPDs of ``variables``.
+
+        The parents and states of those variables must be unchanged. ``self``
+        is left untouched, so it can keep serving queries meanwhile. This
+        default compiles ``model`` from scratch.
+        """
+
+        return type(self)(model)
+
+    def batch_marginals(self, variables: Iterable[str], evidence_rows: Sequence[Optional[Dict]]) -> Dict[str, np.ndarray]:
+        """Posteriors of ``variables`` under each evidence assignment in ``evidence_rows``.
+
+        Returns ``{variable: array of shape (len(evidence_rows), card)}``. A
+        variable observed in a row gets its one-hot evidence back, and rows
+        whose evidence is impossible are ``NaN``. This default runs one
+        ``query_marginals`` per row; vectorized engines override it.
+        """
+
+        variables = list(variables)
+        self._check_query(variables, {})
+        result = {var: np.full((len(evidence_rows), self.cardinality[var]), np.nan) for var in variables}
+        for row, evidence in enumerate(evidence_rows):
+            indices = self.evidence_indices(evidence)
+            hidden = [var for var in variables if var not in indices]
+            try:
+                marginals = self.query_marginals(hidden, evidence) if hidden else {}
+            except ValueError:
+                continue
+            for var in variables:
+                if var in indices:
+                    result[var][row] = 0.0
+                    result[var][row, indices[var]] = 1.0
+                else:
+                    result[var][row] = marginals[var]
+        return result
+
+    def query(self, variables, evidence=None, joint=True, show_progress=False, **kwargs):
+        """Return the posterior over ``variables`` given ``evidence``.
+
+        Single-variable and ``joint=False`` queries go through
+        ``query_marginals``. A joint distribution over several variables is
+        delegated to pgmpy's ``VariableElimination``.
+        """
+
+        variables = list(variables)
+        if joint and len(variables) > 1:
+            if self._fallback is None:
+                from pgmpy.inference import VariableElimination
+                self._fallback = VariableElimination(self.model)
+            return self._fallback.query(variables=variables, evidence=evidence, joint=True, show_progress=False)
+
+        marginals = self.query_marginals(variables, evidence)
+        factors = {
+            var: DiscreteFactor(
+                variables=[var],
+                cardinality=[self.cardinality[var]],
+                values=values,
+                state_names={var: self.state_names[var]},
+            )
+            for var, values in marginals.items()
+        }
+        if joint:
+            return factors[variables[0]]
+        return factors
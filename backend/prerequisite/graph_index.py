@@ -0,0 +1,111 @@
+"""Precomputed structure of a cached network.
+
+Routes and planners keep asking the same structural questions: who are the
+prerequisites of a node, what does it unlock, which nodes lie upstream of
+it, in what order can they be taught? ``GraphIndex`` answers them from
+integer arrays built once when ``get_model`` compiles a network, instead of
+walking the pgmpy/networkx graph on every request. Nodes are numbered in
+``nodes`` order; node sets are ``int32`` arrays of those numbers, or boolean
+rows over them.
+
+The index describes structure only, so it stays valid when CPD values are
+patched in place.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import networkx as nx
+import numpy as np
+
+
+def _adjacency(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR form of per-node neighbour lists: ``(ptr, idx)`` with ``idx[ptr[i]:ptr[i + 1]]`` for node ``i``."""
+
+    ptr = np.zeros(len(lists) + 1, dtype=np.int32)
+    ptr[1:] = np.cumsum([len(items) for items in lists])
+    idx = np.array([i for items in lists for i in items], dtype=np.int32)
+    return ptr, idx
+
+
+class GraphIndex:
+    """Structural indexes of one network.
+
+    * ``parent_ptr``/``parent_idx`` and ``child_ptr``/``child_idx``: direct
+      parents and children in CSR form. Parents keep ``model.get_parents``
+      order, which is also the evidence order of the node's CPD.
+    * ``ancestors[i, j]`` is true when ``j`` is an ancestor (direct or
+      indirect prerequisite) of ``i``; ``descendants`` is its transpose.
+    * ``order`` lists the node numbers in a topological order and ``rank[i]``
+      is node ``i``'s position in it.
+    * ``depth[i]`` is the length of the longest prerequisite chain above
+      ``i`` (0 for roots).
+    * ``roots`` and ``leaves`` are the nodes without parents and children.
+    """
+
+    def __init__(self, model) -> None:
+        self.nodes: List[str] = list(model.nodes())
+        self.index: Dict[str, int] = {node: i for i, node in enumerate(self.nodes)}
+        count = len(self.nodes)
+
+        self.parent_ptr, self.parent_idx = _adjacency(
+            [[self.index[p] for p in model.get_parents(node)] for node in self.nodes]
+        )
+        self.child_ptr, self.child_idx = _adjacency(
+            [[self.index[c] for c in model.get_children(node)] for node in self.nodes]
+        )
+
+        self.order = np.array([self.index[node] for node in nx.topological_sort(model)], dtype=np.int32)
+        self.rank = np.empty(count, dtype=np.int32)
+        self.rank[self.order] = np.arange(count, dtype=np.int32)
+
+        self.ancestors = np.zeros((count, count), dtype=bool)
+        self.depth = np.zeros(count, dtype=np.int32)
+        for i in self.order:
+            for p in self.parents(i):
+                self.ancestors[i] |= self.ancestors[p]
+                self.ancestors[i, p] = True
+                self.depth[i] = max(self.depth[i], self.depth[p] + 1)
+        self.descendants = np.ascontiguousarray(self.ancestors.T)
+
+        self.roots = np.flatnonzero(np.diff(self.parent_ptr) == 0).astype(np.int32)
+        self.leaves = np.flatnonzero(np.diff(self.child_ptr) == 0).astype(np.int32)
+
+    def parents(self, i: int) -> np.ndarray:
+        return self.parent_idx[self.parent_ptr[i]:self.parent_ptr[i + 1]]
+
+    def children(self, i: int) -> np.ndarray:
+        return self.child_idx[self.child_ptr[i]:self.child_ptr[i + 1]]
+
+    def names(self, members) -> List[str]:
+        return [self.nodes[i] for i in members]
+
+    def parents_of(self, node: str) -> List[str]:
+        """Direct prerequisites of ``node``, in CPD evidence order."""
+
+        return self.names(self.parents(self.index[node]))
+
+    def children_of(self, node: str) -> List[str]:
+        return self.names(self.children(self.index[node]))
+
+    def is_leaf(self, node: str) -> bool:
+        i = self.index[node]
+        return self.child_ptr[i] == self.child_ptr[i + 1]
+
+    def ancestors_of(self, node: str) -> List[str]:
+        """Every ancestor of ``node``, in topological order."""
+
+        members = np.flatnonzero(self.ancestors[self.index[node]])
+        return self.names(members[np.argsort(self.rank[members])])
+
+    def descendants_of(self, node: str) -> List[str]:
+        """Every descendant of ``node``, in topological order."""
+
+        members = np.flatnonzero(self.descendants[self.index[node]])
+        return self.names(members[np.argsort(self.rank[members])])
+
+    def structure(self) -> List[Dict]:
+        """``[{"node", "parents"}]`` for every node, as the network-structure routes return it."""
+
+        return [{"node": node, "parents": self.parents_of(node)} for node in self.nodes]
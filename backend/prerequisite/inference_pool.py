@@ -0,0 +1,168 @@
+"""Optional process pool for CPU-bound inference.
+
+Inference is mostly Python code, so concurrent requests on the threaded
+Flask server take turns on the GIL. ``InferencePool`` sends whole inference
+tasks (``run_manual_query``, the ``/assess`` loop) to a pool of worker
+processes instead. Each worker imports the app modules and keeps its own
+``get_model`` cache. A worker notices CPD edits made elsewhere through the
+same database version check as any other process.
+
+Submissions are bounded: at most ``max_pending`` tasks may be queued or
+running, and further requests fail fast with ``InferencePoolBusy`` instead
+of piling up. Callers wait at most ``timeout`` seconds before
+``InferenceTimeout``. A timed-out task keeps its slot until its worker
+finishes, so the bound covers work that is really in flight. If a worker
+dies (for example OOM-killed), the pool is rebuilt for the next task and the
+caller gets ``InferenceWorkerLost``.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+_IN_WORKER = False
+
+
+class InferencePoolBusy(RuntimeError):
+    """Too many inference tasks are already queued or running."""
+
+
+class InferenceTimeout(TimeoutError):
+    """An inference task did not finish within the pool timeout."""
+
+
+class InferenceWorkerLost(RuntimeError):
+    """A worker process died; the pool is restarted for the next task."""
+
+
+def in_worker() -> bool:
+    """True inside a pool worker process, where tasks must run inline."""
+
+    return _IN_WORKER
+
+
+def _init_worker(warm: bool) -> None:
+    global _IN_WORKER
+    _IN_WORKER = True
+    if warm:
+        from prerequisite.prerequisite_api import warm_model_cache
+        warm_model_cache(max_workers=1)
+
+
+def _ping() -> bool:
+    return True
+
+
+class InferencePool:
+    """Bounded, timed front end to a ``spawn``-based ``ProcessPoolExecutor``.
+
+    ``spawn`` is used rather than ``fork`` so workers never inherit locks
+    held by the server's request threads.
+    """
+
+    def __init__(self, processes: int, timeout: float = 10.0, max_pending: int = 64, warm: bool = False) -> None:
+        self.processes = processes
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.warm = warm
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.warm,),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken executor; the next task starts a fresh one."""
+
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """Spawn every worker now instead of on the first request."""
+
+        executor = self._get_executor()
+        for _ in range(self.processes):
+            executor.submit(_ping)
+
+    def _finished(self, future) -> None:
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failures += 1
+            else:
+                self.completed += 1
+        self._slots.release()
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        """Run ``fn(*args)`` in a worker and return its result.
+
+        ``fn`` must be a module-level function, and its arguments and result
+        must be picklable.
+        """
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise InferencePoolBusy(f"Inference pool is busy ({self.max_pending} tasks pending)")
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._discard(executor)
+            raise InferenceWorkerLost("Inference pool is restarting after a worker died; try again")
+        with self._lock:
+            self.pending += 1
+        future.add_done_callback(self._finished)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise InferenceTimeout(f"Inference timed out after {self.timeout:g}s")
+        except BrokenProcessPool:
+            print("❌ Inference worker died; restarting the inference pool.")
+            self._discard(executor)
+            raise InferenceWorkerLost("Inference pool is restarting after a worker died; try again")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "timeout": self.timeout,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,72 @@
+"""Multi-step remediation paths over a network's prerequisite ancestry.
+
+``determine_next_focus`` picks one direct prerequisite. ``plan_learning_path``
+looks at every ancestor of the failed competency instead. One inference
+gives the mastery posterior of each ancestor the student has not passed,
+given the failure and the rest of their recorded progress. Ancestors below
+``threshold`` are weak. They are ordered so that no competency comes before
+one of its own weak prerequisites, and among the competencies that are ready
+the weakest comes first. The failed competency closes the path.
+
+All structural lookups go through the entry's ``GraphIndex``.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+from prerequisite.student_profile import MASTERED_STATE, NOT_MASTERED_STATE
+
+DEFAULT_THRESHOLD = 0.5
+
+
+def plan_learning_path(model_data: Dict, failed: str, evidence: Dict[str, str], threshold: float = DEFAULT_THRESHOLD) -> Dict:
+    """Remediation path for ``failed`` given the student's other ``evidence``.
+
+    Returns ``path`` (weak ancestors in study order, each with its
+    ``mastery_probability`` and the weak ancestors, ``prerequisites``, that
+    come before it),
+    ``strong`` (unobserved ancestors at or above ``threshold``) and
+    ``mastered`` (ancestors the student has passed). Raises ``ValueError`` if
+    ``failed`` is not in the network or the evidence is impossible.
+    """
+
+    graph = model_data["graph"]
+    if failed not in graph.index:
+        raise ValueError(f"Competency '{failed}' not in model")
+    evidence = {**evidence, failed: NOT_MASTERED_STATE}
+
+    ancestors = graph.ancestors_of(failed)
+    mastered = [node for node in ancestors if evidence.get(node) == MASTERED_STATE]
+    hidden = [node for node in ancestors if node not in evidence]
+    marginals = model_data["infer"].query_marginals(hidden, evidence=evidence) if hidden else {}
+    mastery = {node: float(values[1]) for node, values in marginals.items()}
+    mastery.update({node: 0.0 for node in ancestors if evidence.get(node) == NOT_MASTERED_STATE})
+
+    weak = [node for node in ancestors if node in mastery and mastery[node] < threshold]
+    members = np.array([graph.index[node] for node in weak], dtype=np.int32)
+    waits_for = graph.ancestors[np.ix_(members, members)] if len(weak) else np.zeros((0, 0), dtype=bool)
+    strength = np.array([mastery[node] for node in weak])
+
+    path = []
+    remaining = np.ones(len(weak), dtype=bool)
+    while remaining.any():
+        ready = np.flatnonzero(remaining & ~(waits_for & remaining).any(axis=1))
+        k = ready[np.argmin(strength[ready])]
+        remaining[k] = False
+        path.append({
+            "competency": weak[k],
+            "mastery_probability": mastery[weak[k]],
+            "prerequisites": [weak[j] for j in np.flatnonzero(waits_for[k])],
+        })
+
+    return {
+        "competency": failed,
+        "threshold": threshold,
+        "path": path,
+        "goal": failed,
+        "strong": [{"competency": node, "mastery_probability": mastery[node]} for node in hidden if mastery[node] >= threshold],
+        "mastered": mastered,
+    }
@@ -0,0 +1,193 @@
+"""Bounded, evicting cache for loaded Bayesian Networks.
+
+Each cached entry holds a full pgmpy model plus its compiled inference engine,
+so an unbounded dict grows with every network admins add. ``ModelCache``
+limits the cache by entry count and/or an estimated byte budget, evicts the
+least recently used network first, can expire entries after a TTL and keeps
+counters for introspection.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator
+
+import numpy as np
+
+# Rough allowance for the Python objects (networkx graph, pgmpy CPD wrappers)
+# that sit around the NumPy arrays of one node.
+_PER_NODE_OVERHEAD = 4096
+
+
+def _array_bytes(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_array_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_array_bytes(v) for v in value)
+    return 0
+
+
+def estimate_model_bytes(model_data: Dict[str, Any]) -> int:
+    """Estimate the memory held by one ``get_model`` entry."""
+
+    total = 0
+    model = model_data.get("model")
+    if model is not None:
+        total += _PER_NODE_OVERHEAD * len(model.nodes())
+        total += sum(np.asarray(cpd.values).nbytes for cpd in model.get_cpds())
+
+    engine = model_data.get("infer")
+    seen = set()
+    while engine is not None and id(engine) not in seen:
+        seen.add(id(engine))
+        state = vars(engine)
+        total += sum(_array_bytes(v) for k, v in state.items() if k != "engine")
+        engine = state.get("engine")
+    return total
+
+
+class ModelCache:
+    """Thread-safe LRU cache of ``{"model", "infer", ...}`` entries keyed by network name.
+
+    ``max_entries`` and ``max_bytes`` of ``0`` mean unlimited; ``ttl`` of ``0``
+    means entries never expire. The most recently inserted entry is never
+    evicted to make room for itself, even if it alone exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, ttl: float = 0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return bool(self.ttl) and time.monotonic() - entry["loaded_at"] > self.ttl
+
+    def _drop(self, name: str) -> Dict[str, Any]:
+        entry = self._entries.pop(name)
+        self.total_bytes -= entry["nbytes"]
+        return entry
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return the cached model data for ``name`` and mark it recently used."""
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and self._expired(entry):
+                self._drop(name)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(name)
+            entry["hits"] += 1
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, name: str, value: Dict[str, Any], load_seconds: float = 0.0) -> None:
+        """Insert or replace ``name``, then evict older entries until within budget."""
+
+        nbytes = estimate_model_bytes(value)
+        with self._lock:
+            if name in self._entries:
+                self._drop(name)
+            self._entries[name] = {
+                "value": value,
+                "nbytes": nbytes,
+                "loaded_at": time.monotonic(),
+                "load_seconds": load_seconds,
+                "hits": 0,
+            }
+            self.total_bytes += nbytes
+            while len(self._entries) > 1 and (
+                (self.max_entries and len(self._entries) > self.max_entries)
+                or (self.max_bytes and self.total_bytes > self.max_bytes)
+            ):
+                evicted, _ = next(iter(self._entries.items()))
+                self._drop(evicted)
+                self.evictions += 1
+                print(f"♻️ Evicted from model cache: {evicted}")
+
+    def update_size(self, name: str, value: Dict[str, Any]) -> None:
+        """Re-estimate the bytes of ``name`` after ``value`` grew in place, if it is still cached."""
+
+        nbytes = estimate_model_bytes(value)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry["value"] is not value:
+                return
+            self.total_bytes += nbytes - entry["nbytes"]
+            entry["nbytes"] = nbytes
+
+    def pop(self, name: str, default: Any = None) -> Any:
+        with self._lock:
+            if name not in self._entries:
+                return default
+            return self._drop(name)["value"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry is not None and not self._expired(entry)
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name: str, value: Dict[str, Any]) -> None:
+        self.put(name, value)
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            self._drop(name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus per-network size, load time, age and hit count."""
+
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "networks": {
+                    name: {
+                        "bytes": entry["nbytes"],
+                        "load_seconds": round(entry["load_seconds"], 4),
+                        "age_seconds": round(now - entry["loaded_at"], 1),
+                        "hits": entry["hits"],
+                    }
+                    for name, entry in self._entries.items()
+                },
+            }
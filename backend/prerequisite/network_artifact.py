@@ -0,0 +1,97 @@
+"""Compact pre-compiled form of a network, stored next to its BIF text.
+
+Parsing BIF through pgmpy's pyparsing grammar takes seconds per network. The
+artifact keeps what is needed to rebuild the model instead, as flat NumPy
+arrays in an ``.npz`` blob:
+
+* ``nodes`` and ``cardinality`` in model order;
+* ``parents`` / ``parent_offsets``: node indices of each CPD's evidence, in CPD order;
+* ``states`` / ``state_offsets``: state names of each node;
+* ``values`` / ``value_offsets``: each CPD's table, flattened in C order.
+
+Artifacts are only written for models that passed ``check_model()``, so
+loading one skips validation.
+"""
+
+from __future__ import annotations
+
+import io
+
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+from pgmpy.models import DiscreteBayesianNetwork
+
+ARTIFACT_FORMAT = 1
+
+
+def build_artifact(model) -> bytes:
+    """Serialize a validated model into artifact bytes."""
+
+    nodes = list(model.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    cardinality = []
+    parents, parent_offsets = [], [0]
+    states, state_offsets = [], [0]
+    values, value_offsets = [], [0]
+    for node in nodes:
+        cpd = model.get_cpds(node)
+        cardinality.append(int(model.get_cardinality(node)))
+        parents.extend(index[p] for p in cpd.variables[1:])
+        parent_offsets.append(len(parents))
+        states.extend(str(s) for s in cpd.state_names[node])
+        state_offsets.append(len(states))
+        flat = np.asarray(cpd.values, dtype=np.float64).ravel()
+        values.append(flat)
+        value_offsets.append(value_offsets[-1] + flat.size)
+
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        format=np.array([ARTIFACT_FORMAT], dtype=np.int32),
+        nodes=np.array(nodes, dtype=np.str_),
+        cardinality=np.array(cardinality, dtype=np.int32),
+        parents=np.array(parents, dtype=np.int32),
+        parent_offsets=np.array(parent_offsets, dtype=np.int32),
+        states=np.array(states, dtype=np.str_),
+        state_offsets=np.array(state_offsets, dtype=np.int32),
+        values=np.concatenate(values) if values else np.zeros(0),
+        value_offsets=np.array(value_offsets, dtype=np.int64),
+    )
+    return buffer.getvalue()
+
+
+def load_artifact(blob: bytes) -> DiscreteBayesianNetwork:
+    """Rebuild a ready-to-query model from artifact bytes."""
+
+    with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+        if int(data["format"][0]) != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported network artifact format {int(data['format'][0])}")
+        nodes = [str(n) for n in data["nodes"]]
+        cardinality = data["cardinality"].tolist()
+        parents, parent_offsets = data["parents"], data["parent_offsets"]
+        states, state_offsets = data["states"], data["state_offsets"]
+        values, value_offsets = data["values"], data["value_offsets"]
+
+        state_names = {
+            node: [str(s) for s in states[state_offsets[i]:state_offsets[i + 1]]]
+            for i, node in enumerate(nodes)
+        }
+        index = {node: i for i, node in enumerate(nodes)}
+        model = DiscreteBayesianNetwork()
+        model.add_nodes_from(nodes)
+        cpds = []
+        for i, node in enumerate(nodes):
+            evidence = [nodes[p] for p in parents[parent_offsets[i]:parent_offsets[i + 1]]]
+            model.add_edges_from((parent, node) for parent in evidence)
+            evidence_card = [cardinality[index[p]] for p in evidence]
+            table = values[value_offsets[i]:value_offsets[i + 1]].reshape(cardinality[i], -1)
+            cpds.append(TabularCPD(
+                variable=node,
+                variable_card=cardinality[i],
+                values=table,
+                evidence=evidence or None,
+                evidence_card=evidence_card or None,
+                state_names={v: state_names[v] for v in [node] + evidence},
+            ))
+        model.add_cpds(*cpds)
+    return model
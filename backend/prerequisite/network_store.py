@@ -0,0 +1,148 @@
+"""Reads and writes of the ``bayesian_networks`` table.
+
+Every write goes through ``save_network_content`` (or, for CPD patches that
+must not overwrite a concurrent edit, ``patch_network_content``) so the
+``version`` column is bumped and ``content_hash`` recomputed on each change.
+Workers compare the stored version with the one they loaded to notice edits
+made by other processes. The ``compiled`` column holds the network's binary artifact (see
+``network_artifact``); ``compiled_hash`` records which content it was built
+from, so a stale artifact is never used.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from typing import Optional
+
+from database import get_db_connection
+
+_columns_ready = False
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 hex digest of a network's BIF text."""
+
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def ensure_network_columns(cursor: sqlite3.Cursor) -> None:
+    """Add the ``version``, ``content_hash`` and artifact columns to older databases."""
+
+    global _columns_ready
+    if _columns_ready:
+        return
+
+    cursor.execute("PRAGMA table_info(bayesian_networks)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "version" not in columns:
+        cursor.execute("ALTER TABLE bayesian_networks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    if "content_hash" not in columns:
+        cursor.execute("ALTER TABLE bayesian_networks ADD COLUMN content_hash TEXT")
+    if "compiled" not in columns:
+        cursor.execute("ALTER TABLE bayesian_networks ADD COLUMN compiled BLOB")
+    if "compiled_hash" not in columns:
+        cursor.execute("ALTER TABLE bayesian_networks ADD COLUMN compiled_hash TEXT")
+
+    cursor.execute("SELECT name, content FROM bayesian_networks WHERE content_hash IS NULL")
+    for name, content in cursor.fetchall():
+        cursor.execute(
+            "UPDATE bayesian_networks SET content_hash = ? WHERE name = ?",
+            (content_hash(content), name),
+        )
+    cursor.connection.commit()
+    _columns_ready = True
+
+
+def fetch_network(name: str) -> Optional[sqlite3.Row]:
+    """Return the ``content``, ``version``, ``content_hash`` and artifact columns of ``name``, or ``None``."""
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_network_columns(cursor)
+        cursor.execute(
+            "SELECT content, version, content_hash, compiled, compiled_hash FROM bayesian_networks WHERE name = ?",
+            (name,),
+        )
+        return cursor.fetchone()
+    finally:
+        conn.close()
+
+
+def fetch_version(name: str) -> Optional[int]:
+    """Cheap lookup of the stored version of ``name``."""
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_network_columns(cursor)
+        cursor.execute("SELECT version FROM bayesian_networks WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def store_artifact(name: str, digest: str, artifact: bytes) -> None:
+    """Save ``artifact`` for ``name`` if its content still hashes to ``digest``."""
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_network_columns(cursor)
+        cursor.execute(
+            "UPDATE bayesian_networks SET compiled = ?, compiled_hash = ? WHERE name = ? AND content_hash = ?",
+            (sqlite3.Binary(artifact), digest, name, digest),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def save_network_content(cursor: sqlite3.Cursor, name: str, content: str, artifact: Optional[bytes] = None) -> int:
+    """Write ``content`` for ``name`` (inserting it if missing) and return the new version.
+
+    ``artifact`` should be built from the validated model that ``content`` was
+    written from. Without one the old artifact is cleared and the next
+    ``get_model`` rebuilds it. The caller owns the transaction and must commit.
+    """
+
+    ensure_network_columns(cursor)
+    digest = content_hash(content)
+    compiled = sqlite3.Binary(artifact) if artifact is not None else None
+    compiled_hash = digest if artifact is not None else None
+    cursor.execute(
+        "UPDATE bayesian_networks SET content = ?, content_hash = ?, compiled = ?, compiled_hash = ?, "
+        "version = version + 1 WHERE name = ?",
+        (content, digest, compiled, compiled_hash, name),
+    )
+    if cursor.rowcount == 0:
+        cursor.execute(
+            "INSERT INTO bayesian_networks (name, content, content_hash, compiled, compiled_hash, version) "
+            "VALUES (?, ?, ?, ?, ?, 1)",
+            (name, content, digest, compiled, compiled_hash),
+        )
+    cursor.execute("SELECT version FROM bayesian_networks WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
+
+
+def patch_network_content(cursor: sqlite3.Cursor, name: str, expected_hash: str, content: str, artifact: bytes) -> Optional[int]:
+    """Like ``save_network_content``, but only if ``name`` still hashes to ``expected_hash``.
+
+    Returns the new version, or ``None`` when the stored network has changed
+    since ``expected_hash`` was read (or does not exist). The caller owns the
+    transaction and must commit.
+    """
+
+    ensure_network_columns(cursor)
+    digest = content_hash(content)
+    cursor.execute(
+        "UPDATE bayesian_networks SET content = ?, content_hash = ?, compiled = ?, compiled_hash = ?, "
+        "version = version + 1 WHERE name = ? AND content_hash = ?",
+        (content, digest, sqlite3.Binary(artifact), digest, name, expected_hash),
+    )
+    if cursor.rowcount == 0:
+        return None
+    cursor.execute("SELECT version FROM bayesian_networks WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
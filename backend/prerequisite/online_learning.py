@@ -0,0 +1,263 @@
+"""Online CPD updates from live assessment submissions.
+
+``record_submission`` runs after ``submit_assessment`` has committed the
+result, on its own connection. It loads the network before it writes
+anything, so a cold model load never waits on a lock the request holds. A
+graded result on an assessment that is linked to a competency node is one
+observation of that node: state ``'1'`` for a pass, ``'0'`` for a fail
+(``PASS_RATIO``). The student's latest state of every node is kept in
+``bn_student_states``. If the latest states of all of the node's parents are
+known, the observation adds one pseudo-count to the matching CPD row in
+``cpd_counts``. That is a primary-key lookup per parent and one upsert, with
+no scan of past results. Observations with an unknown parent are only
+tallied as ``skipped``. The offline EM job (``learn_cpds.py``) is what learns
+from incomplete evidence.
+
+``publish_counts`` turns the counts into fresh CPDs. Each edited column
+becomes ``prior_weight · current + counts``, normalized. The result goes
+through ``patch_cpds``, so it is saved as a new version and swapped into the
+model cache. The consumed counts are subtracted in the same transaction.
+Because the current CPD always weighs ``prior_weight`` pseudo-cases, older
+data fades with every publish, and the tables track the live student
+population. The counts are keyed by each node's parent list, so counts
+collected before an edit to the network's structure are discarded rather
+than misapplied.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from pgmpy.factors.discrete import TabularCPD
+
+from database import get_db_connection
+from prerequisite.cpd_learning import PASS_RATIO
+from prerequisite.prerequisite_api import get_model, patch_cpds
+from prerequisite.student_profile import MASTERED_STATE, NOT_MASTERED_STATE
+
+ONLINE_LEARNING = os.environ.get('BN_ONLINE_LEARNING', 'False').lower() == 'true'
+PUBLISH_INTERVAL = float(os.environ.get('BN_ONLINE_PUBLISH_SECONDS', 300))
+PRIOR_WEIGHT = float(os.environ.get('BN_ONLINE_PRIOR_WEIGHT', 50))
+MIN_UPDATES = int(os.environ.get('BN_ONLINE_MIN_UPDATES', 1))
+
+_tables_ready = False
+
+
+def ensure_count_tables(conn: sqlite3.Connection) -> None:
+    """Create the count tables and commit; later calls in this process are free."""
+
+    global _tables_ready
+    if _tables_ready:
+        return
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cpd_counts ("
+        "network TEXT NOT NULL, node TEXT NOT NULL, parents TEXT NOT NULL, "
+        "parent_config INTEGER NOT NULL, state INTEGER NOT NULL, count REAL NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (network, node, parents, parent_config, state))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bn_student_states ("
+        "student_id TEXT NOT NULL, network TEXT NOT NULL, node TEXT NOT NULL, state TEXT NOT NULL, "
+        "PRIMARY KEY (student_id, network, node))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cpd_count_networks ("
+        "network TEXT PRIMARY KEY, pending INTEGER NOT NULL DEFAULT 0, skipped INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.commit()
+    _tables_ready = True
+
+
+def record_submission(student_id: str, assessment_id: int, score: float, total: float) -> Optional[bool]:
+    """Feed one graded, already committed result into the counts.
+
+    Returns ``True`` if a count was added, ``False`` if the result was only
+    remembered (a parent state is unknown) and ``None`` if the assessment is
+    not linked to a node of a loadable network.
+    """
+
+    if not total or total <= 0:
+        return None
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT bif_file, competency_node FROM assessments WHERE id = ?", (assessment_id,)).fetchone()
+        if not row or not row[0] or not row[1]:
+            return None
+        network, node = row[0], row[1]
+        # May load and compile the network, writing on other connections: nothing may be written here yet.
+        model_data = get_model(network)
+        if not model_data or node not in model_data["graph"].index:
+            return None
+
+        ensure_count_tables(conn)
+        counted = _count_observation(conn.cursor(), model_data, network, node, student_id,
+                                     MASTERED_STATE if score / total >= PASS_RATIO else NOT_MASTERED_STATE)
+        conn.commit()
+        return counted
+    finally:
+        conn.close()
+
+
+def _count_observation(cursor: sqlite3.Cursor, model_data: Dict, network: str, node: str, student_id: str, state: str) -> bool:
+    cpd = model_data["model"].get_cpds(node)
+    parents = list(cpd.variables[1:])
+
+    known: Dict[str, str] = {}
+    for parent in parents:
+        cursor.execute(
+            "SELECT state FROM bn_student_states WHERE student_id = ? AND network = ? AND node = ?",
+            (student_id, network, parent),
+        )
+        found = cursor.fetchone()
+        if found:
+            known[parent] = found[0]
+    cursor.execute(
+        "INSERT INTO bn_student_states (student_id, network, node, state) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (student_id, network, node) DO UPDATE SET state = excluded.state",
+        (student_id, network, node, state),
+    )
+
+    states = {var: [str(s) for s in cpd.state_names[var]] for var in cpd.variables}
+    counted = len(known) == len(parents) and all(known[p] in states[p] for p in parents) and state in states[node]
+    if counted:
+        config = 0
+        for parent in parents:
+            config = config * len(states[parent]) + states[parent].index(known[parent])
+        cursor.execute(
+            "INSERT INTO cpd_counts (network, node, parents, parent_config, state, count) VALUES (?, ?, ?, ?, ?, 1) "
+            "ON CONFLICT (network, node, parents, parent_config, state) DO UPDATE SET count = count + 1",
+            (network, node, ",".join(parents), config, states[node].index(state)),
+        )
+    cursor.execute(
+        "INSERT INTO cpd_count_networks (network, pending, skipped) VALUES (?, ?, ?) "
+        "ON CONFLICT (network) DO UPDATE SET pending = pending + excluded.pending, skipped = skipped + excluded.skipped",
+        (network, int(counted), int(not counted)),
+    )
+    return counted
+
+
+def publish_counts(prior_weight: float = PRIOR_WEIGHT, min_updates: int = MIN_UPDATES) -> List[Dict]:
+    """Blend the pending counts of every network into its CPDs and publish them.
+
+    Networks with fewer than ``min_updates`` pending counts are left for a
+    later round, and so are networks whose save is refused because they were
+    edited meanwhile. Returns one summary per network that was published.
+    """
+
+    conn = get_db_connection()
+    try:
+        ensure_count_tables(conn)
+        networks = conn.execute(
+            "SELECT network, pending FROM cpd_count_networks WHERE pending >= ? AND pending > 0", (min_updates,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    published = []
+    for network, pending in networks:
+        try:
+            summary = _publish_network(network, pending, prior_weight)
+        except Exception as e:
+            print(f"❌ Could not publish online counts of '{network}': {e}")
+            continue
+        if summary:
+            published.append(summary)
+    return published
+
+
+def _publish_network(network: str, pending: int, prior_weight: float) -> Optional[Dict]:
+    model_data = get_model(network)
+    if not model_data:
+        return None
+    model = model_data["model"]
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT node, parents, parent_config, state, count FROM cpd_counts WHERE network = ? AND count > 0",
+            (network,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    counts: Dict[str, np.ndarray] = {}
+    stale = []
+    for row in rows:
+        node = row["node"]
+        cpd = model.get_cpds(node) if node in model_data["graph"].index else None
+        if cpd is None or row["parents"] != ",".join(cpd.variables[1:]):
+            stale.append(row)
+            continue
+        table = counts.setdefault(node, np.zeros(np.asarray(cpd.values).reshape(cpd.variable_card, -1).shape))
+        table[row["state"], row["parent_config"]] += row["count"]
+
+    cpds = []
+    for node, table in counts.items():
+        cpd = model.get_cpds(node)
+        current = np.asarray(cpd.values, dtype=float).reshape(table.shape)
+        blended = prior_weight * current + table
+        values = blended / blended.sum(axis=0, keepdims=True)
+        cpds.append(TabularCPD(
+            node,
+            cpd.variable_card,
+            values,
+            evidence=list(cpd.variables[1:]) or None,
+            evidence_card=[int(c) for c in cpd.cardinality[1:]] or None,
+            state_names={v: list(cpd.state_names[v]) for v in cpd.variables},
+        ))
+
+    def consume(cursor: sqlite3.Cursor) -> None:
+        for row in rows:
+            cursor.execute(
+                "UPDATE cpd_counts SET count = count - ? WHERE network = ? AND node = ? AND parents = ? "
+                "AND parent_config = ? AND state = ?",
+                (row["count"], network, row["node"], row["parents"], row["parent_config"], row["state"]),
+            )
+        cursor.execute("DELETE FROM cpd_counts WHERE network = ? AND count <= 0", (network,))
+        cursor.execute("UPDATE cpd_count_networks SET pending = MAX(pending - ?, 0) WHERE network = ?", (pending, network))
+
+    if cpds:
+        # The counts are consumed in the same transaction as the new CPD text, so they are
+        # applied exactly once even if this process dies or another publisher runs meanwhile.
+        if patch_cpds(network, model_data, cpds, before_commit=consume) is None:
+            print(f"⏳ '{network}' changed while publishing online counts; retrying next round.")
+            return None
+    else:
+        conn = get_db_connection()
+        try:
+            consume(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+
+    used = sum(row["count"] for row in rows) - sum(row["count"] for row in stale)
+    print(f"📈 Published online counts of '{network}': {int(used)} observations over {len(cpds)} CPDs, {len(stale)} stale rows dropped.")
+    return {"network": network, "observations": int(used), "cpds": len(cpds), "stale_rows": len(stale)}
+
+
+_PUBLISHER: Optional[threading.Thread] = None
+
+
+def start_count_publisher(interval: float = PUBLISH_INTERVAL) -> None:
+    """Run ``publish_counts`` every ``interval`` seconds on a daemon thread (once per process)."""
+
+    global _PUBLISHER
+    if _PUBLISHER is not None or interval <= 0:
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                publish_counts()
+            except Exception as e:
+                print(f"❌ Online count publisher failed: {e}")
+
+    _PUBLISHER = threading.Thread(target=loop, name="bn-count-publisher", daemon=True)
+    _PUBLISHER.start()
+    print(f"📈 Publishing online CPD counts every {interval:g}s.")
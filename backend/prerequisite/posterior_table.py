@@ -0,0 +1,69 @@
+"""Precomputed single-evidence posteriors for the prerequisite networks.
+
+The tutoring hot path only ever conditions on one competency at a time (the
+one the student failed). ``SingleEvidencePosteriors`` runs every such query
+once when ``get_model`` loads a network and keeps the answers in one dense
+NumPy array, so those queries become an index lookup.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+class SingleEvidencePosteriors:
+    """Wrap an inference engine with a ``P(query | one evidence node)`` lookup table.
+
+    ``table[e, s, q, :]`` holds the posterior of node ``q`` given node ``e`` in
+    state ``s``. Rows for impossible evidence stay ``NaN``. Queries with no
+    evidence or with more than one evidence node go to the wrapped engine.
+    """
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.variables = list(engine.variables)
+        self.index: Dict[str, int] = {v: i for i, v in enumerate(self.variables)}
+        self.cardinality = dict(engine.cardinality)
+
+        count = len(self.variables)
+        width = max(self.cardinality.values(), default=1)
+        self.table = np.full((count, width, count, width), np.nan)
+        self._fill(engine)
+
+    def _fill(self, engine) -> None:
+        """Fill the table with one ``batch_marginals`` call over every ``(node, state)`` evidence row."""
+
+        rows = [(e, s) for e, var in enumerate(self.variables) for s in range(self.cardinality[var])]
+        evidence = [{self.variables[e]: engine.state_names[self.variables[e]][s]} for e, s in rows]
+        nodes = np.array([e for e, _ in rows], dtype=int)
+        states = np.array([s for _, s in rows], dtype=int)
+        for name, values in engine.batch_marginals(self.variables, evidence).items():
+            q = self.index[name]
+            self.table[nodes, states, q, :values.shape[1]] = values
+            self.table[q, :, q, :] = np.nan
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def query_marginals(self, variables: Iterable[str], evidence: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """Same contract as the engine's ``query_marginals``, served from the table when possible."""
+
+        if not evidence or len(evidence) != 1:
+            return self.engine.query_marginals(variables, evidence)
+
+        variables = list(variables)
+        (var, s), = self.engine.evidence_indices(evidence).items()
+        e = self.index[var]
+        result: Dict[str, np.ndarray] = {}
+        for name in variables:
+            if name not in self.index:
+                raise ValueError(f"Query variable '{name}' is not in the model")
+            if name == var:
+                raise ValueError(f"Can't have the same variables in both `variables` and `evidence`. Found in both: {{'{var}'}}")
+            values = self.table[e, s, self.index[name], :self.cardinality[name]]
+            if np.isnan(values[0]):
+                raise ValueError("The evidence has zero probability under this network")
+            result[name] = values
+        return result
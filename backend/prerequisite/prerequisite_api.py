@@ -1,65 +1,431 @@
-from flask import Blueprint, request, jsonify
-from pgmpy.readwrite import BIFReader, BIFWriter
-from pgmpy.inference import VariableElimination
+from flask import Blueprint, Response, request, jsonify
+from pgmpy.readwrite import BIFWriter
 from pgmpy.factors.discrete import TabularCPD
 import numpy as np
 import io
+import os
+from functools import partial
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from database import get_db_connection
+from prerequisite.engine_base import InferenceEngine
+from prerequisite.graph_index import GraphIndex
+from prerequisite.junction_tree import JunctionTreeEngine
+from prerequisite.einsum_engine import EinsumEngine
+from prerequisite.sampling_engine import LikelihoodWeightingEngine
+from prerequisite.posterior_table import SingleEvidencePosteriors
+from prerequisite.query_cache import QueryCache, MemoizedEngine
+from prerequisite.model_cache import ModelCache
+from prerequisite.network_store import content_hash as bif_content_hash, fetch_network, fetch_version, patch_network_content, save_network_content, store_artifact
+from prerequisite.network_artifact import build_artifact, load_artifact
+from prerequisite.bif_parser import UnsupportedBIF, read_bif, replace_probability_blocks
+from prerequisite.inference_pool import InferencePool, InferencePoolBusy, InferenceTimeout, InferenceWorkerLost, in_worker
+from prerequisite.adaptive_testing import fetch_assessments_by_node, rank_by_information_gain
+from prerequisite.learning_path import DEFAULT_THRESHOLD, plan_learning_path
+from prerequisite.student_profile import MASTERED_STATE, fetch_progress_evidence, infer_profile, network_for_domain
 
 prereq_bp = Blueprint('prereq', __name__)
 
-# This dictionary now acts as our in-memory cache.
-LOADED_MODELS = {}
+# In-memory model cache: LRU-evicted by entry count and/or estimated bytes, with optional TTL (seconds).
+LOADED_MODELS = ModelCache(
+    max_entries=int(os.environ.get('BN_MODEL_CACHE_MAX_ENTRIES', 32)),
+    max_bytes=int(os.environ.get('BN_MODEL_CACHE_MAX_BYTES', 0)),
+    ttl=float(os.environ.get('BN_MODEL_CACHE_TTL', 0)),
+)
+
+# Precompute P(node | one evidence node) tables when a network is loaded.
+# Costs 2·N propagations per network, paid once per worker.
+PRECOMPUTE_POSTERIORS = os.environ.get('BN_PRECOMPUTE_POSTERIORS', 'True').lower() == 'true'
+
+# Memoized query results shared by every cached network, keyed by content hash.
+QUERY_CACHE = QueryCache(max_entries=int(os.environ.get('BN_QUERY_CACHE_SIZE', 4096)))
+
+# Default budget of the approximate likelihood_weighting engine: samples per query,
+# and an optional cap (seconds, 0 for none) on the time spent drawing them.
+SAMPLE_BUDGET = int(os.environ.get('BN_SAMPLES', 20000))
+SAMPLE_SECONDS = float(os.environ.get('BN_SAMPLE_SECONDS', 0))
+# Ceilings on a per-request budget, so one request can't hold a worker indefinitely.
+MAX_SAMPLES = int(os.environ.get('BN_MAX_SAMPLES', 200000))
+MAX_SAMPLE_SECONDS = float(os.environ.get('BN_MAX_SAMPLE_SECONDS', 5))
+
+# Compiled inference engines that can fill the "infer" slot. BN_ENGINE picks the
+# default; BN_NETWORK_ENGINES overrides it per network, e.g.
+# "operations.bif=einsum,counting.bif=junction_tree". /assess can also pick one per request.
+INFERENCE_ENGINES = {
+    "junction_tree": JunctionTreeEngine,
+    "einsum": EinsumEngine,
+    "likelihood_weighting": partial(LikelihoodWeightingEngine, samples=SAMPLE_BUDGET, seconds=SAMPLE_SECONDS),
+}
+DEFAULT_ENGINE = os.environ.get('BN_ENGINE', 'junction_tree')
+NETWORK_ENGINES = {
+    name.strip(): engine.strip()
+    for name, _, engine in (item.partition('=') for item in os.environ.get('BN_NETWORK_ENGINES', '').split(','))
+    if engine.strip()
+}
+
+def engine_for(filename):
+    """Name of the inference engine configured for `filename`."""
+    name = NETWORK_ENGINES.get(filename, DEFAULT_ENGINE)
+    if name not in INFERENCE_ENGINES:
+        print(f"Unknown inference engine '{name}' for '{filename}', using junction_tree.")
+        return "junction_tree"
+    return name
+
+# Engine for batched queries: /next-assessment candidates and the cohort mastery matrix.
+# Its batch_marginals should be vectorized: the junction tree answers rows one by one.
+ADAPTIVE_ENGINE = os.environ.get('BN_ADAPTIVE_ENGINE', 'einsum')
+if ADAPTIVE_ENGINE not in INFERENCE_ENGINES:
+    raise ValueError(f"BN_ADAPTIVE_ENGINE='{ADAPTIVE_ENGINE}' is not one of {sorted(INFERENCE_ENGINES)}")
+
+# How often (ms) a cached network re-checks its version in the DB, so CPD edits
+# made through another worker process are picked up without a restart.
+VERSION_CHECK_INTERVAL = int(os.environ.get('BN_VERSION_CHECK_MS', 1000)) / 1000.0
+
+def _is_stale(filename, model_data):
+    """Throttled comparison of the cached network version with the one stored in the DB."""
+    now = time.monotonic()
+    if now - model_data["checked_at"] < VERSION_CHECK_INTERVAL:
+        return False
+    model_data["checked_at"] = now
+    try:
+        return fetch_version(filename) != model_data["version"]
+    except Exception as e:
+        print(f"Could not check version of '{filename}': {e}")
+        return False
+
+# Optional process pool for inference (BN_INFERENCE_PROCESSES > 0). Tasks wait at most
+# BN_INFERENCE_TIMEOUT seconds, and at most BN_INFERENCE_MAX_PENDING may be queued or running.
+INFERENCE_PROCESSES = int(os.environ.get('BN_INFERENCE_PROCESSES', 0))
+INFERENCE_POOL = InferencePool(
+    processes=INFERENCE_PROCESSES,
+    timeout=float(os.environ.get('BN_INFERENCE_TIMEOUT', 10)),
+    max_pending=int(os.environ.get('BN_INFERENCE_MAX_PENDING', 64)),
+    warm=os.environ.get('BN_PREWARM', 'False').lower() == 'true',
+) if INFERENCE_PROCESSES > 0 else None
+
+def run_inference(fn, *args):
+    """
+    Runs fn(*args) in the inference pool when one is configured, else inline.
+    Raises InferencePoolBusy, InferenceTimeout or InferenceWorkerLost when the pool can't
+    take or finish it.
+    """
+    if INFERENCE_POOL is None or in_worker():
+        return fn(*args)
+    return INFERENCE_POOL.run(fn, *args)
+
+# In-flight loads, so concurrent misses for the same network share one load.
+_LOADING = {}
+_LOADING_LOCK = threading.Lock()
 
-def get_model(filename):
+def get_model(filename, precompute=None):
     """
     Lazily loads a Bayesian Network from the database into the cache if not already present.
-    Returns the model and inference engine.
+    Returns the model and inference engine. The engine (see engine_for) is compiled
+    once here: by default a calibrated junction tree, so queries only pass messages
+    over cached potentials.
+    With `precompute` (defaults to BN_PRECOMPUTE_POSTERIORS) a freshly loaded engine
+    is wrapped in a single-evidence posterior table so one-node evidence queries
+    are lookups. Results are memoized in QUERY_CACHE in front of the engine.
+    A cached model is reloaded when its version in the DB has moved on.
+    Concurrent misses for the same network wait for the first caller's load.
     """
+    if precompute is None:
+        precompute = PRECOMPUTE_POSTERIORS
+
     # 1. Cache Hit: If model is already loaded, return it immediately.
-    if filename in LOADED_MODELS:
-        print(f"✅ Cache HIT for: {filename}")
-        return LOADED_MODELS[filename]
+    model_data = LOADED_MODELS.get(filename)
+    if model_data is not None:
+        if not _is_stale(filename, model_data):
+            print(f"✅ Cache HIT for: {filename}")
+            return model_data
+        print(f"🔄 '{filename}' changed in the database since version {model_data['version']}.")
+        clear_model_cache(filename)
+
+    # 2. Cache Miss: the first caller loads, concurrent callers wait on its result.
+    with _LOADING_LOCK:
+        model_data = LOADED_MODELS.get(filename) if filename in LOADED_MODELS else None
+        if model_data is not None:
+            return model_data
+        future = _LOADING.get(filename)
+        is_loader = future is None
+        if is_loader:
+            future = Future()
+            _LOADING[filename] = future
+
+    if not is_loader:
+        print(f"⏳ Waiting for in-flight load of: {filename}")
+        return future.result()
 
-    # 2. Cache Miss: If not loaded, fetch from DB.
+    try:
+        model_data = _load_model(filename, precompute)
+        future.set_result(model_data)
+        return model_data
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _LOADING_LOCK:
+            _LOADING.pop(filename, None)
+
+def _load_model(filename, precompute):
+    """Fetches, parses and compiles one network, then stores it in LOADED_MODELS."""
     print(f"⚠️ Cache MISS for: {filename}. Loading from DB...")
+    started = time.perf_counter()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT content FROM bayesian_networks WHERE name = ?", (filename,))
-        network = cursor.fetchone()
-        conn.close()
+        network = fetch_network(filename)
 
         if not network:
             raise FileNotFoundError(f"Network '{filename}' not found in the database.")
 
-        bif_reader = BIFReader(string=network['content'])
-        model = bif_reader.get_model()
-        model.check_model()
-        infer = VariableElimination(model)
-
-        # 3. Store the newly loaded model in the cache.
-        LOADED_MODELS[filename] = {"model": model, "infer": infer}
+        content_hash = network['content_hash'] or bif_content_hash(network['content'])
+        model = _model_from_artifact(filename, network, content_hash)
+        if model is None:
+            model = read_bif(network['content'])
+            model.check_model()
+            try:
+                store_artifact(filename, content_hash, build_artifact(model))
+            except Exception as e:
+                print(f"Could not store compiled artifact for '{filename}': {e}")
+        model_data = compile_model(filename, model, content_hash, network['version'], precompute)
+        LOADED_MODELS.put(filename, model_data, load_seconds=time.perf_counter() - started)
         print(f"👍 Loaded and cached: {filename}")
-        
-        return LOADED_MODELS[filename]
+
+        return model_data
 
     except Exception as e:
         print(f"❌ Error loading '{filename}' from DB: {e}")
         return None
 
+def compile_model(filename, model, content_hash, version, precompute=None):
+    """
+    Builds the inference engine stack of a validated model and returns its cache entry.
+    Nothing is cached here: _load_model stores the entry, and CPD edits publish it with
+    publish_model once the new content is saved.
+    """
+    if precompute is None:
+        precompute = PRECOMPUTE_POSTERIORS
+    engine_name = engine_for(filename)
+    engine = INFERENCE_ENGINES[engine_name](model)
+    # A table of sampled answers would cost 2·N sampled queries per load, on exactly
+    # the networks that were too large for exact inference.
+    posteriors = SingleEvidencePosteriors(engine) if precompute and engine.exact else None
+    infer = MemoizedEngine(engine if posteriors is None else posteriors, QUERY_CACHE, filename, content_hash)
+    return {
+        "model": model,
+        "graph": GraphIndex(model),
+        "infer": infer,
+        "posteriors": posteriors,
+        "engine": engine_name,
+        "content_hash": content_hash,
+        "version": version,
+        "checked_at": time.monotonic(),
+    }
+
+def inference_for(model_data, engine=None, samples=None, seconds=None):
+    """
+    The inference stack that answers one request. Without `engine` (or with the network's
+    own) that's the cached model_data["infer"]. Another engine is compiled on first use
+    and kept on the entry; its answers are not memoized in QUERY_CACHE, which only holds
+    the network's own engine's results. `samples`/`seconds` set the budget of a sampling engine,
+    clamped to MAX_SAMPLES/MAX_SAMPLE_SECONDS.
+    """
+    if engine is None or engine == model_data["engine"]:
+        infer = model_data["infer"]
+    else:
+        alternates = model_data.setdefault("alternates", {})
+        infer = alternates.get(engine)
+        if infer is None:
+            infer = alternates[engine] = INFERENCE_ENGINES[engine](model_data["model"])
+    if (samples is not None or seconds is not None) and hasattr(infer, "with_budget"):
+        samples = None if samples is None else min(samples, MAX_SAMPLES)
+        seconds = None if seconds is None else min(seconds, MAX_SAMPLE_SECONDS)
+        infer = infer.with_budget(samples, seconds)
+    return infer
+
+def snapshot_model(model):
+    """Private copy of a cached model for copy-on-write edits; the cached one is never mutated."""
+    snapshot = model.copy()
+    snapshot.name = model.name
+    return snapshot
+
+def publish_model(filename, model_data):
+    """
+    Swaps an edited, compiled network into the cache with one reference replacement.
+    Requests already holding the previous entry finish on it; new requests get the new one.
+    """
+    LOADED_MODELS.put(filename, model_data)
+    QUERY_CACHE.invalidate(filename)
+    print(f"🔁 Published version {model_data['version']} of: {filename}")
+
+# Rebuilds the posterior tables of patched networks off the request path.
+_POSTERIOR_BUILDER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bn-posteriors")
+
+def patch_cpds(filename, model_data, cpds, before_commit=None):
+    """
+    Saves CPD edits that keep every edited node's parents and states, without a full rewrite.
+    Only the edited probability blocks of the stored BIF text are replaced (the whole text is
+    rewritten with BIFWriter if the stored BIF can't be spliced), the engine recompiles just
+    the affected cliques or factors (InferenceEngine.with_cpds), and cached queries that can't
+    depend on the edited nodes move over to the new version. The posterior table, if the entry
+    had one, is rebuilt in the background.
+    before_commit(cursor), if given, runs in the save's transaction once the content update
+    has gone through; if it raises, nothing is saved.
+    Returns the published entry, or None when the edit needs the full save path: the
+    structure changed, or the stored network moved on since model_data was loaded.
+    """
+    model = model_data["model"]
+    for cpd in cpds:
+        if cpd.variable not in model_data["graph"].index:
+            return None
+        current = model.get_cpds(cpd.variable)
+        if list(current.variables) != list(cpd.variables) or any(
+            list(current.state_names[v]) != list(cpd.state_names[v]) for v in cpd.variables
+        ):
+            return None
+
+    network = fetch_network(filename)
+    if not network or network['content_hash'] != model_data["content_hash"]:
+        return None
+
+    candidate = snapshot_model(model)
+    candidate.remove_cpds(*[candidate.get_cpds(cpd.variable) for cpd in cpds])
+    candidate.add_cpds(*cpds)
+    candidate.check_model()
+    try:
+        new_content = replace_probability_blocks(network['content'], cpds)
+    except UnsupportedBIF as e:
+        print(f"Can't splice '{filename}' in place ({e}); rewriting its BIF text.")
+        new_content = str(BIFWriter(candidate))
+
+    engine = model_data["infer"]
+    while not isinstance(engine, InferenceEngine):
+        engine = engine.engine
+    edited = [cpd.variable for cpd in cpds]
+    engine = engine.with_cpds(candidate, edited)
+    new_hash = bif_content_hash(new_content)
+    patched = {
+        **{key: value for key, value in model_data.items() if key not in ("alternates", "payloads")},
+        "model": candidate,
+        "infer": MemoizedEngine(engine, QUERY_CACHE, filename, new_hash),
+        "posteriors": None,
+        "content_hash": new_hash,
+        "checked_at": time.monotonic(),
+    }
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        version = patch_network_content(cursor, filename, model_data["content_hash"], new_content, build_artifact(candidate))
+        if version is not None:
+            if before_commit is not None:
+                before_commit(cursor)
+            conn.commit()
+    finally:
+        conn.close()
+    if version is None:
+        return None
+    patched["version"] = version
+
+    affected = set(edited)
+    for var in edited:
+        affected.update(model_data["graph"].descendants_of(var))
+    LOADED_MODELS.put(filename, patched)
+    kept, dropped = QUERY_CACHE.rekey(filename, model_data["content_hash"], new_hash, affected)
+    print(f"🩹 Patched {', '.join(edited)} in {filename} (version {version}); kept {kept} cached queries, dropped {dropped}.")
+
+    if model_data["posteriors"] is not None:
+        _POSTERIOR_BUILDER.submit(_attach_posteriors, filename, patched, engine)
+    return patched
+
+def _attach_posteriors(filename, model_data, engine):
+    """Builds the posterior table of a patched entry and swaps it in front of the engine."""
+    try:
+        posteriors = SingleEvidencePosteriors(engine)
+    except Exception as e:
+        print(f"Could not rebuild posterior table of '{filename}': {e}")
+        return
+    model_data["posteriors"] = posteriors
+    model_data["infer"] = MemoizedEngine(posteriors, QUERY_CACHE, filename, model_data["content_hash"])
+    LOADED_MODELS.update_size(filename, model_data)
+
+def _model_from_artifact(filename, network, content_hash):
+    """Rebuilds the model from the stored binary artifact when it matches the current BIF text."""
+    if network['compiled'] is None or network['compiled_hash'] != content_hash:
+        return None
+    try:
+        return load_artifact(network['compiled'])
+    except Exception as e:
+        print(f"Ignoring unreadable compiled artifact for '{filename}': {e}")
+        return None
+
 def clear_model_cache(filename=None):
-    """Clears the entire model cache, or just a specific model."""
+    """Clears the entire model cache, or just a specific model, with its memoized queries."""
     if filename:
-        if filename in LOADED_MODELS:
-            del LOADED_MODELS[filename]
+        QUERY_CACHE.invalidate(filename)
+        if LOADED_MODELS.pop(filename) is not None:
             print(f"🔥 Cache cleared for: {filename}")
     else:
+        QUERY_CACHE.invalidate()
         LOADED_MODELS.clear()
         print("🔥 Entire model cache cleared.")
 
 # We no longer eagerly load all files on startup.
 # BIF_LOAD_ERRORS = load_bif_files()
+# Instead, app.py can opt in to warming the cache in the background (BN_PREWARM=true).
+# Requests that arrive before warming finishes still load lazily through get_model.
+WARMUP_STATUS = {"state": "disabled", "total": 0, "loaded": [], "failed": [], "seconds": None}
+_WARMUP_LOCK = threading.Lock()
+
+def warm_model_cache(max_workers=2):
+    """Loads every network in bayesian_networks into the cache and records progress in WARMUP_STATUS."""
+    started = time.perf_counter()
+    try:
+        conn = get_db_connection()
+        names = [row['name'] for row in conn.execute("SELECT name FROM bayesian_networks")]
+        conn.close()
+    except Exception as e:
+        print(f"❌ Cache warm-up could not list networks: {e}")
+        names = []
+
+    with _WARMUP_LOCK:
+        WARMUP_STATUS.update({"state": "warming", "total": len(names), "loaded": [], "failed": []})
+
+    def warm(name):
+        model_data = get_model(name)
+        with _WARMUP_LOCK:
+            WARMUP_STATUS["loaded" if model_data else "failed"].append(name)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bn-warmup") as pool:
+        list(pool.map(warm, names))
+
+    with _WARMUP_LOCK:
+        WARMUP_STATUS.update({"state": "ready", "seconds": round(time.perf_counter() - started, 3)})
+    print(f"🔥 Model cache warm-up finished: {len(WARMUP_STATUS['loaded'])}/{len(names)} networks loaded.")
+    return WARMUP_STATUS
+
+def start_cache_warmup(max_workers=2):
+    """Starts warm_model_cache in a daemon thread and returns immediately."""
+    with _WARMUP_LOCK:
+        WARMUP_STATUS.update({"state": "warming"})
+    thread = threading.Thread(target=warm_model_cache, args=(max_workers,), name="bn-warmup", daemon=True)
+    thread.start()
+    return thread
+
+@prereq_bp.route('/health/ready', methods=['GET'])
+def readiness():
+    # 503 while warming so a load balancer holds traffic until the caches are hot.
+    with _WARMUP_LOCK:
+        status = dict(WARMUP_STATUS, loaded=list(WARMUP_STATUS["loaded"]), failed=list(WARMUP_STATUS["failed"]))
+    return jsonify(status), (503 if status["state"] == "warming" else 200)
+
+@prereq_bp.route('/model-cache/stats', methods=['GET'])
+def model_cache_stats():
+    return jsonify({
+        "models": LOADED_MODELS.stats(),
+        "queries": QUERY_CACHE.stats(),
+        "inference_pool": INFERENCE_POOL.stats() if INFERENCE_POOL else None,
+    })
 
 @prereq_bp.route('/biffiles', methods=['GET'])
 def list_bif_files():
@@ -74,6 +440,31 @@ def list_bif_files():
     except Exception as e:
         return jsonify({"error": f"Database error: {e}"}), 500
 
+def network_response(model_data, key, build):
+    """
+    Answers a GET whose body depends only on a cached network's content.
+    The strong ETag is the content hash computed when the network was loaded, so a
+    matching If-None-Match gets a 304 without build() running. Otherwise the encoded
+    body is built once per cache entry and kept under model_data["payloads"][key]; CPD
+    edits publish a new entry, which starts with no payloads. Error responses from
+    build() (status tuples) are neither cached nor tagged. no-cache makes clients
+    revalidate each time.
+    """
+    etag = model_data["content_hash"]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        payloads = model_data.setdefault("payloads", {})
+        if key not in payloads:
+            built = build()
+            if isinstance(built, tuple):
+                return built
+            payloads[key] = built.get_data()
+        response = Response(payloads[key], mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
 @prereq_bp.route("/competencies", methods=["GET"])
 def get_competencies():
     filename = request.args.get("bif")
@@ -85,9 +476,7 @@ def get_competencies():
     if not model_data:
         return jsonify({"error": f"BIF file '{filename}' not found or failed to load"}), 404
 
-    model = model_data["model"]
-    nodes = list(model.nodes())
-    return jsonify({"competencies": nodes})
+    return network_response(model_data, "competencies", lambda: jsonify({"competencies": model_data["graph"].nodes}))
 
 @prereq_bp.route("/assess", methods=["POST"])
 def assess_competencies():
@@ -95,18 +484,48 @@ def assess_competencies():
     if not filename:
         return jsonify({"error": "Missing 'bif' query parameter"}), 400
 
-    # Use the lazy-loading function
-    model_data = get_model(filename)
-    if not model_data:
-        return jsonify({"error": f"BIF file '{filename}' not found"}), 404
-
     data = request.get_json()
     if not data or "tested" not in data:
         return jsonify({"error": "Missing 'tested' in request body"}), 400
 
-    tested = data.get("tested", [])
+    engine = data.get("engine")
+    if engine is not None and engine not in INFERENCE_ENGINES:
+        return jsonify({"error": f"Unknown engine '{engine}'. Choose from {sorted(INFERENCE_ENGINES)}"}), 400
+    try:
+        samples = int(data["samples"]) if data.get("samples") is not None else None
+        seconds = float(data["seconds"]) if data.get("seconds") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'samples' and 'seconds' must be numbers"}), 400
+    if (samples is not None and samples <= 0) or (seconds is not None and not seconds > 0):
+        return jsonify({"error": "'samples' and 'seconds' must be positive"}), 400
+
+    try:
+        results = run_inference(
+            assess_tested, filename, data.get("tested", []), data.get("student_id"), data.get("domain_id"),
+            engine, samples, seconds,
+        )
+    except (InferencePoolBusy, InferenceWorkerLost) as e:
+        return jsonify({"error": str(e)}), 503
+    except InferenceTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    if results is None:
+        return jsonify({"error": f"BIF file '{filename}' not found"}), 404
+
+    return jsonify({"assessment_results": results})
+
+def assess_tested(filename, tested, student_id, domain_id, engine=None, samples=None, seconds=None):
+    """
+    Runs determine_next_focus for every failed item of an /assess request, optionally
+    with another inference engine or sample budget (see inference_for).
+    Returns None when the network can't be loaded. Kept at module level so
+    run_inference can ship it to a pool worker.
+    """
+    model_data = get_model(filename)
+    if not model_data:
+        return None
+
     model = model_data["model"]
-    infer = model_data["infer"]
+    infer = inference_for(model_data, engine, samples, seconds)
 
     results = []
     for item in tested:
@@ -120,13 +539,16 @@ def assess_competencies():
             if score < 7:
                 # ✅ FIX: Pass the evidence state as 0 for the manual query.
                 # The determine_next_focus function will handle converting it to a string.
-                outcome = determine_next_focus(model, infer, comp, 0)
-                results.append({
+                outcome = determine_next_focus(model_data["graph"], infer, comp, student_id, domain_id, 0)
+                result = {
                     "competency": comp,
                     "score": score,
                     "next_focus": outcome.get("next_focus"),
                     "mastery_probabilities": outcome.get("mastery_probabilities")
-                })
+                }
+                if "mastery_errors" in outcome:
+                    result["mastery_errors"] = outcome["mastery_errors"]
+                results.append(result)
             else:
                 results.append({
                     "competency": comp,
@@ -137,17 +559,132 @@ def assess_competencies():
         except Exception as e:
             results.append({"competency": comp, "score": score, "error": f"Failed to assess: {e}"})
 
-    return jsonify({"assessment_results": results})
+    return results
+
+@prereq_bp.route("/student-profile", methods=["GET"])
+def get_student_profile():
+    """
+    Mastery map of one student: all of their pass/fail rows in student_progress for the
+    domain are observed together, and every unassessed competency gets its posterior
+    from a single inference. `bif` defaults to the network the domain's assessments use.
+    """
+    student_id = request.args.get("student_id")
+    domain_id = request.args.get("domain_id")
+    if not student_id or not domain_id:
+        return jsonify({"error": "Missing 'student_id' or 'domain_id' query parameter"}), 400
+
+    filename = request.args.get("bif") or network_for_domain(domain_id)
+    if not filename:
+        return jsonify({"error": f"Domain '{domain_id}' is not linked to a Bayesian Network"}), 404
+
+    model_data = get_model(filename)
+    if not model_data:
+        return jsonify({"error": f"BIF file '{filename}' not found"}), 404
 
-def determine_next_focus(model, infer, failed_competency, student_id, domain_id, evidence_state=0):
+    try:
+        profile = infer_profile(model_data, fetch_progress_evidence(student_id, domain_id))
+    except ValueError as e:
+        return jsonify({"error": f"Recorded progress is inconsistent with '{filename}': {e}"}), 400
+
+    return jsonify({"student_id": student_id, "domain_id": domain_id, "bif": filename, **profile})
+
+@prereq_bp.route("/learning-path", methods=["GET"])
+def get_learning_path():
+    """
+    Full remediation path for a failed competency: every weak ancestor, prerequisites first
+    and weakest first among those that are ready, ending with the competency itself.
+    Query: bif, competency, optional student_id and domain_id (recorded progress is used
+    as extra evidence) and threshold (mastery below it is weak, default 0.5).
+    """
+    filename = request.args.get("bif")
+    competency = request.args.get("competency")
+    if not filename or not competency:
+        return jsonify({"error": "Missing 'bif' or 'competency' query parameter"}), 400
+    try:
+        threshold = float(request.args.get("threshold", DEFAULT_THRESHOLD))
+    except ValueError:
+        return jsonify({"error": "'threshold' must be a number"}), 400
+
+    model_data = get_model(filename)
+    if not model_data:
+        return jsonify({"error": f"BIF file '{filename}' not found"}), 404
+
+    student_id = request.args.get("student_id")
+    domain_id = request.args.get("domain_id")
+    evidence = fetch_progress_evidence(student_id, domain_id) if student_id and domain_id else {}
+    evidence = {node: state for node, state in evidence.items() if node in model_data["graph"].index}
+    try:
+        plan = plan_learning_path(model_data, competency, evidence, threshold)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"bif": filename, **plan})
+
+@prereq_bp.route("/next-assessment", methods=["POST"])
+def next_assessment():
+    """
+    Adaptive testing: the untested competency whose result is expected to reduce the
+    uncertainty about the student's mastery the most, with its assessment.
+    Body: "bif" (or "domain_id" to use the domain's network), optionally "student_id" and
+    "domain_id" to start from their recorded progress, "evidence" ({node: 0/1}) with
+    answers given since, and "top" (default 5) for how many ranked candidates to return.
+    Only competencies with an assessment are candidates, unless "any_competency" is true.
+    Evidence on competencies that are not in the network is ignored.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    student_id = data.get("student_id")
+    domain_id = data.get("domain_id")
+    filename = data.get("bif") or (network_for_domain(domain_id) if domain_id else None)
+    if not filename:
+        return jsonify({"error": "Missing 'bif' (or a 'domain_id' linked to a network)"}), 400
+    if not isinstance(data.get("evidence", {}), dict):
+        return jsonify({"error": "'evidence' must be an object of {competency: 0 or 1}"}), 400
+    try:
+        top = int(data.get("top", 5))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'top' must be a whole number"}), 400
+    if top < 0:
+        return jsonify({"error": "'top' must not be negative"}), 400
+
+    model_data = get_model(filename)
+    if not model_data:
+        return jsonify({"error": f"BIF file '{filename}' not found"}), 404
+
+    graph = model_data["graph"]
+    nodes = graph.nodes
+    evidence = fetch_progress_evidence(student_id, domain_id) if student_id and domain_id else {}
+    evidence.update({node: str(state) for node, state in data.get("evidence", {}).items()})
+    evidence = {node: state for node, state in evidence.items() if node in graph.index}
+
+    assessments = fetch_assessments_by_node(filename)
+    candidates = None if data.get("any_competency") else list(assessments)
+    try:
+        scored = rank_by_information_gain(inference_for(model_data, ADAPTIVE_ENGINE), nodes, evidence, candidates)
+    except ValueError as e:
+        return jsonify({"error": f"Evidence is inconsistent with '{filename}': {e}"}), 400
+
+    ranking = [{**item, **assessments.get(item["competency"], {"assessment_id": None, "title": None})} for item in scored["ranking"]]
+    return jsonify({
+        "bif": filename,
+        "evidence": {node: int(state == MASTERED_STATE) for node, state in evidence.items()},
+        "entropy": scored["entropy"],
+        "next": ranking[0] if ranking else None,
+        "ranking": ranking[:top],
+    })
+
+def determine_next_focus(graph, infer, failed_competency, student_id, domain_id, evidence_state=0):
     """
     Determines the most likely prerequisite to focus on, excluding already passed competencies.
-    evidence_state defaults to 0 (not mastered).
+    evidence_state defaults to 0 (not mastered). With an approximate engine the result also
+    carries "mastery_errors", the standard error of each mastery probability.
+    graph is the network's cached GraphIndex.
     """
-    if failed_competency not in model.nodes():
+    if failed_competency not in graph.index:
         return {"next_focus": None, "error": f"Competency '{failed_competency}' not in model"}
 
-    prerequisites = model.get_parents(failed_competency)
+    prerequisites = graph.parents_of(failed_competency)
 
     # --- NEW: Check if it's a top-level node first ---
     if not prerequisites:
@@ -158,14 +695,8 @@ def determine_next_focus(model, infer, failed_competency, student_id, domain_id,
     passed_competencies = set()
     if student_id and domain_id:
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT competency_node FROM student_progress WHERE student_id = ? AND domain_id = ? AND actual_mastery = ?",
-                (student_id, domain_id, "✔ Pass")
-            )
-            passed_competencies = {row['competency_node'] for row in cursor.fetchall()}
-            conn.close()
+            progress = fetch_progress_evidence(student_id, domain_id)
+            passed_competencies = {node for node, state in progress.items() if state == MASTERED_STATE}
         except Exception as e:
             print(f"Could not fetch student progress: {e}")
 
@@ -180,23 +711,29 @@ def determine_next_focus(model, infer, failed_competency, student_id, domain_id,
         return {"next_focus": eligible_prerequisites[0]}
 
     prob_dict = {}
-    for pre in eligible_prerequisites:
-        try:
-            # ✅ FIX: The evidence value MUST be a string to match the BIF state names ('0', '1').
-            evidence_dict = {failed_competency: str(evidence_state)}
-            
-            print(f"  - [determine_next_focus] Querying for '{pre}' with evidence: {evidence_dict}")
-
-            # Query for the probability of the prerequisite being mastered (state 1)
-            # given the evidence that the dependent competency was in a specific state.
-            result = infer.query(variables=[pre], evidence=evidence_dict)
-            # The probability of being in state '1' (mastered)
-            prob_dict[pre] = result.values[1]
-        except Exception as e:
-            print(f"Error inferring for {pre}: {e}")
+    error_dict = {}
+    try:
+        # ✅ FIX: The evidence value MUST be a string to match the BIF state names ('0', '1').
+        evidence_dict = {failed_competency: str(evidence_state)}
+
+        print(f"  - [determine_next_focus] Querying {eligible_prerequisites} with evidence: {evidence_dict}")
+
+        # One propagation gives the marginals of every eligible prerequisite under
+        # the same evidence; index 1 is the probability of state '1' (mastered).
+        if getattr(infer, "exact", True):
+            marginals = infer.query_marginals(eligible_prerequisites, evidence=evidence_dict)
+        else:
+            estimate = infer.estimate(eligible_prerequisites, evidence=evidence_dict)
+            marginals = estimate["marginals"]
+            error_dict = {pre: float(values[1]) for pre, values in estimate["std_errors"].items()}
+        prob_dict = {pre: values[1] for pre, values in marginals.items()}
+    except Exception as e:
+        print(f"Error inferring prerequisites of {failed_competency}: {e}")
 
     if prob_dict:
         weakest = min(prob_dict, key=prob_dict.get)
+        if error_dict:
+            return {"next_focus": weakest, "mastery_probabilities": prob_dict, "mastery_errors": error_dict}
         return {"next_focus": weakest, "mastery_probabilities": prob_dict}
         
     return {"next_focus": eligible_prerequisites[0]}
@@ -207,35 +744,39 @@ def get_cpds():
     if not filename:
         return jsonify({"error": "Missing 'bif' query parameter"}), 400
 
-    model_data = LOADED_MODELS.get(filename)
+    model_data = get_model(filename)
     if not model_data:
         return jsonify({"error": f"BIF file '{filename}' not found"}), 404
 
-    model = model_data["model"]
-    cpds = {}
-    meta = {}
-    try:
-        for cpd in model.get_cpds():
-            parents = model.get_parents(cpd.variable)
-            parent_values = []
-            for parent in parents:
-                state_names = model.get_cpds(parent).state_names.get(parent, [str(i) for i in range(model.get_cardinality(parent))])
-                parent_values.append({"name": parent, "values": state_names})
-            meta[cpd.variable] = {
-                "parents": parents,
-                "parent_values": parent_values,
-                "state_names": {cpd.variable: cpd.state_names.get(cpd.variable, [str(i) for i in range(cpd.cardinality)])}
-            }
-            if parents:
-                arr = np.array(cpd.values)
-                arr = arr.T.tolist()  # Shape: (num_parent_combos, variable_card)
-                cpds[cpd.variable] = arr
-            else:
-                cpds[cpd.variable] = cpd.values.tolist()
-    except Exception as e:
-        return jsonify({"error": f"Failed to retrieve CPDs: {e}"}), 500
+    def build():
+        model = model_data["model"]
+        graph = model_data["graph"]
+        cpds = {}
+        meta = {}
+        try:
+            for cpd in model.get_cpds():
+                parents = graph.parents_of(cpd.variable)
+                parent_values = []
+                for parent in parents:
+                    state_names = model.get_cpds(parent).state_names.get(parent, [str(i) for i in range(model.get_cardinality(parent))])
+                    parent_values.append({"name": parent, "values": state_names})
+                meta[cpd.variable] = {
+                    "parents": parents,
+                    "parent_values": parent_values,
+                    "state_names": {cpd.variable: cpd.state_names.get(cpd.variable, [str(i) for i in range(cpd.variable_card)])}
+                }
+                if parents:
+                    arr = np.array(cpd.values)
+                    arr = arr.T.tolist()  # Shape: (num_parent_combos, variable_card)
+                    cpds[cpd.variable] = arr
+                else:
+                    cpds[cpd.variable] = cpd.values.tolist()
+        except Exception as e:
+            return jsonify({"error": f"Failed to retrieve CPDs: {e}"}), 500
 
-    return jsonify({"cpds": cpds, "meta": meta})
+        return jsonify({"cpds": cpds, "meta": meta})
+
+    return network_response(model_data, "cpds", build)
 
 @prereq_bp.route("/update_cpds", methods=["POST"])
 def update_cpds():
@@ -243,7 +784,7 @@ def update_cpds():
     if not filename:
         return jsonify({"error": "Missing 'bif' query parameter"}), 400
 
-    model_data = LOADED_MODELS.get(filename)
+    model_data = get_model(filename)
     if not model_data:
         return jsonify({"error": f"BIF file '{filename}' not found"}), 404
 
@@ -255,9 +796,9 @@ def update_cpds():
     try:
         new_cpds = []
         for node, values in updated_cpds.items():
-            if node not in model.nodes():
+            if node not in model_data["graph"].index:
                 return jsonify({"error": f"Node '{node}' not in model"}), 400
-            parents = model.get_parents(node)
+            parents = model_data["graph"].parents_of(node)
             cardinality = model.get_cardinality(node)
             parent_cardinalities = [model.get_cardinality(p) for p in parents]
             num_parent_combos = np.prod(parent_cardinalities) if parents else 1
@@ -283,38 +824,45 @@ def update_cpds():
                 values=values_t,
                 evidence=parents if parents else None,
                 evidence_card=parent_cardinalities if parents else None,
-                state_names={node: model.get_cpds(node).state_names.get(node, [str(i) for i in range(cardinality)])},
+                state_names={
+                    var: model.get_cpds(node).state_names.get(var, [str(i) for i in range(model.get_cardinality(var))])
+                    for var in [node, *parents]
+                },
             )
             new_cpds.append(cpd)
 
         # --- DATABASE UPDATE LOGIC ---
-        # 1. Apply changes to the in-memory model
-        model.remove_cpds(*model.get_cpds())
-        model.add_cpds(*new_cpds)
-        model.check_model() # Validate the new model structure
+        # 0. Edits that keep the parents and states are patched in place (see patch_cpds)
+        if patch_cpds(filename, model_data, new_cpds) is not None:
+            return jsonify({"message": "CPDs updated and saved to database successfully"})
+
+        # 1. Apply changes to a private copy; the cached model keeps serving queries untouched
+        candidate = snapshot_model(model)
+        candidate.remove_cpds(*[candidate.get_cpds(cpd.variable) for cpd in new_cpds])
+        candidate.add_cpds(*new_cpds)
+        candidate.check_model() # Validate the new model structure
 
         # --- FIX: Get string content directly from the writer object ---
-        writer = BIFWriter(model)
+        writer = BIFWriter(candidate)
         new_content = str(writer)
         # --- END FIX ---
 
+        # 2. Compile the copy before anything is written
+        candidate_data = compile_model(filename, candidate, bif_content_hash(new_content), None)
+
         # 3. Update the database
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE bayesian_networks SET content = ? WHERE name = ?",
-            (new_content, filename)
-        )
+        candidate_data["version"] = save_network_content(cursor, filename, new_content, build_artifact(candidate))
         conn.commit()
         conn.close()
 
-        # 4. Reload all models from DB to ensure consistency across the app
-        load_bif_files()
-        
+        # 4. Swap the new model into the cache in one step
+        publish_model(filename, candidate_data)
+
         return jsonify({"message": "CPDs updated and saved to database successfully"})
         # --- END DATABASE UPDATE LOGIC ---
 
     except Exception as e:
-        # If anything fails, reload the original state from the DB to prevent inconsistency
-        load_bif_files()
+        # The cached model was never touched, so there is nothing to roll back
         return jsonify({"error": f"Failed to update CPDs: {e}"}), 500
\ No newline at end of file
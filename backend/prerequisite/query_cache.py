@@ -0,0 +1,122 @@
+"""Bounded LRU memoization of inference results.
+
+Many students fail the same competencies, so the same ``(network, variables,
+evidence)`` query is asked over and over. ``QueryCache`` keeps recent answers
+keyed by the network's content hash plus the canonicalized query, and
+``MemoizedEngine`` puts it in front of an inference engine. After a CPD patch,
+``rekey`` carries the answers the edit cannot have changed over to the new
+content hash.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import AbstractSet, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+def make_query_key(network: str, content_hash: str, variables: Iterable[str], evidence: Optional[Dict]) -> Tuple:
+    """Canonical cache key: variable order and evidence order don't matter."""
+
+    canonical_evidence = tuple(sorted((var, str(state)) for var, state in (evidence or {}).items()))
+    return (network, content_hash, tuple(sorted(set(variables))), canonical_evidence)
+
+
+class QueryCache:
+    """Thread-safe LRU map from query keys to ``{variable: marginal}`` results."""
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, np.ndarray]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Dict[str, np.ndarray]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, network: Optional[str] = None) -> int:
+        """Drop every entry of ``network`` (or everything) and return how many were dropped."""
+
+        with self._lock:
+            if network is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            stale = [key for key in self._entries if key[0] == network]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def rekey(self, network: str, old_hash: str, new_hash: str, affected: AbstractSet[str]) -> Tuple[int, int]:
+        """Move ``network``'s entries from ``old_hash`` to ``new_hash``, dropping those touching ``affected``.
+
+        ``affected`` must hold the edited nodes and all their descendants: a
+        query whose variables and evidence avoid that set has the same answer
+        under both versions, because the edited nodes are then barren. All
+        other entries of ``network`` are dropped. Returns ``(kept, dropped)``.
+        """
+
+        with self._lock:
+            kept = dropped = 0
+            for key in [key for key in self._entries if key[0] == network]:
+                value = self._entries.pop(key)
+                _, digest, variables, evidence = key
+                if digest == old_hash and affected.isdisjoint(variables) and affected.isdisjoint(v for v, _ in evidence):
+                    self._entries[(network, new_hash, variables, evidence)] = value
+                    kept += 1
+                else:
+                    dropped += 1
+            return kept, dropped
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class MemoizedEngine:
+    """Serve ``query_marginals`` from a ``QueryCache`` before asking ``engine``."""
+
+    def __init__(self, engine, cache: QueryCache, network: str, content_hash: str) -> None:
+        self.engine = engine
+        self.cache = cache
+        self.network = network
+        self.content_hash = content_hash
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def query_marginals(self, variables: Iterable[str], evidence: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        variables = list(variables)
+        key = make_query_key(self.network, self.content_hash, variables, evidence)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self.engine.query_marginals(variables, evidence)
+            self.cache.put(key, cached)
+        return {var: cached[var] for var in variables}
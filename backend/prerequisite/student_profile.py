@@ -0,0 +1,161 @@
+"""Student-profile inference: every recorded pass/fail as joint evidence.
+
+``determine_next_focus`` conditions on the one competency a student just
+failed. A profile instead reads all of the student's ``student_progress``
+rows for a domain and observes each pass (state ``'1'``) and fail (state
+``'0'``) together. One ``query_marginals`` call then returns the mastery
+posterior of every competency that has not been assessed yet.
+
+``infer_cohort`` does the same for a whole class at once. Students with the
+same evidence pattern share one row of a single ``batch_marginals`` call.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from database import get_db_connection
+
+PASS_LABEL = "✔ Pass"
+FAIL_LABEL = "✘ Fail"
+
+MASTERED_STATE = "1"
+NOT_MASTERED_STATE = "0"
+
+_STATE_OF_LABEL = {PASS_LABEL: MASTERED_STATE, FAIL_LABEL: NOT_MASTERED_STATE}
+
+# Students per ``IN (...)`` clause, well under SQLite's bound-parameter limit.
+_QUERY_CHUNK = 500
+
+
+def fetch_progress_evidence(student_id: str, domain_id) -> Dict[str, str]:
+    """Return ``{competency node: state}`` for every graded row of the student in ``domain_id``."""
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT competency_node, actual_mastery FROM student_progress WHERE student_id = ? AND domain_id = ?",
+            (student_id, domain_id),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {
+        row["competency_node"]: _STATE_OF_LABEL[row["actual_mastery"]]
+        for row in rows
+        if row["actual_mastery"] in _STATE_OF_LABEL
+    }
+
+
+def fetch_cohort_evidence(domain_id, student_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, str]]:
+    """``fetch_progress_evidence`` for many students, keyed by student id.
+
+    Without ``student_ids`` every student with progress in the domain is
+    returned. Requested students without any graded rows map to ``{}``.
+    """
+
+    conn = get_db_connection()
+    try:
+        if student_ids is None:
+            rows = conn.execute(
+                "SELECT student_id, competency_node, actual_mastery FROM student_progress WHERE domain_id = ?",
+                (domain_id,),
+            ).fetchall()
+            cohort: Dict[str, Dict[str, str]] = {}
+        else:
+            student_ids = list(dict.fromkeys(student_ids))
+            cohort = {student_id: {} for student_id in student_ids}
+            rows = []
+            for start in range(0, len(student_ids), _QUERY_CHUNK):
+                chunk = student_ids[start:start + _QUERY_CHUNK]
+                rows.extend(conn.execute(
+                    "SELECT student_id, competency_node, actual_mastery FROM student_progress "
+                    f"WHERE domain_id = ? AND student_id IN ({','.join('?' * len(chunk))})",
+                    (domain_id, *chunk),
+                ).fetchall())
+    finally:
+        conn.close()
+
+    for row in rows:
+        evidence = cohort.setdefault(row["student_id"], {})
+        if row["actual_mastery"] in _STATE_OF_LABEL:
+            evidence[row["competency_node"]] = _STATE_OF_LABEL[row["actual_mastery"]]
+    return cohort
+
+
+def network_for_domain(domain_id) -> Optional[str]:
+    """The Bayesian Network the domain's assessments are linked to, if any."""
+
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT bif_file FROM assessments WHERE content_domain_id = ? AND bif_file IS NOT NULL AND bif_file != '' "
+            "GROUP BY bif_file ORDER BY COUNT(*) DESC LIMIT 1",
+            (domain_id,),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row["bif_file"] if row else None
+
+
+def infer_profile(model_data: Dict, evidence: Dict[str, str]) -> Dict:
+    """Posterior mastery of every unobserved node given all of ``evidence`` at once.
+
+    Evidence on nodes that are not in the network is ignored and listed under
+    ``ignored``. Raises ``ValueError`` if the evidence is impossible under the
+    network.
+    """
+
+    graph = model_data["graph"]
+    observed = {node: state for node, state in evidence.items() if node in graph.index}
+    unobserved = [node for node in graph.nodes if node not in observed]
+
+    marginals = model_data["infer"].query_marginals(unobserved, evidence=observed) if unobserved else {}
+    return {
+        "observed": {node: int(state == MASTERED_STATE) for node, state in observed.items()},
+        "mastery_probabilities": {node: float(values[1]) for node, values in marginals.items()},
+        "ignored": sorted(node for node in evidence if node not in graph.index),
+    }
+
+
+def infer_cohort(model_data: Dict, evidence_by_student: Dict[str, Dict[str, str]], infer=None) -> Dict:
+    """Students × competencies matrix of mastery posteriors.
+
+    Students are grouped by their evidence on the network's nodes, and each
+    distinct pattern is one row of a single ``batch_marginals`` call on
+    ``infer`` (default: the entry's own engine), which should be a vectorized
+    engine such as ``einsum``. Observed
+    competencies appear as ``1``/``0`` (and in ``observed``). Rows of students
+    whose evidence is impossible are ``None``.
+    """
+
+    graph = model_data["graph"]
+    nodes: List[str] = graph.nodes
+    students = list(evidence_by_student)
+
+    patterns: Dict[tuple, int] = {}
+    pattern_of: List[int] = []
+    for student in students:
+        observed = tuple(sorted(
+            (node, state) for node, state in evidence_by_student[student].items() if node in graph.index
+        ))
+        pattern_of.append(patterns.setdefault(observed, len(patterns)))
+
+    rows = [dict(pattern) for pattern in patterns]
+    mastery: List[List[Optional[float]]] = []
+    if rows:
+        marginals = (infer or model_data["infer"]).batch_marginals(nodes, rows)
+        matrix = np.column_stack([marginals[node][:, 1] for node in nodes])
+        mastery = [[None if np.isnan(value) else float(value) for value in row] for row in matrix]
+
+    return {
+        "competencies": nodes,
+        "students": students,
+        "matrix": [mastery[pattern] for pattern in pattern_of],
+        "observed": [
+            [int(rows[pattern][node] == MASTERED_STATE) if node in rows[pattern] else None for node in nodes]
+            for pattern in pattern_of
+        ],
+        "distinct_patterns": len(rows),
+    }
@@ -5,7 +5,8 @@ from __future__ import annotations
 import sqlite3
 from typing import Dict, Optional, Tuple, Union
 
-from prerequisite.prerequisite_api import get_model, determine_next_focus
+from prerequisite.inference_pool import InferencePoolBusy, InferenceTimeout, InferenceWorkerLost
+from prerequisite.prerequisite_api import get_model, determine_next_focus, run_inference
 
 
 def _get_connection() -> sqlite3.Connection:
@@ -24,6 +25,19 @@ def _normalize_score(value: float) -> Union[float, int]:
     return float(value)
 
 
+def query_error_status(error: str) -> int:
+    """HTTP status for an ``error`` returned by ``run_manual_query`` or ``run_auto_query``."""
+
+    lower_error = error.lower()
+    if "not found" in lower_error or "not loaded" in lower_error:
+        return 404
+    if "busy" in lower_error or "restarting" in lower_error:
+        return 503
+    if "timed out" in lower_error:
+        return 504
+    return 400
+
+
 def run_manual_query(
     bif_file: str,
     competency: str,
@@ -36,8 +50,25 @@ def run_manual_query(
 
     Returns a tuple of (result, error). When ``error`` is ``None`` the ``result``
     contains the computed mastery probabilities and next focus recommendation.
+    The query runs in the inference process pool when one is configured.
     """
 
+    try:
+        return run_inference(_run_manual_query, bif_file, competency, score, total, student_id, domain_id)
+    except (InferencePoolBusy, InferenceTimeout, InferenceWorkerLost) as e:
+        return None, str(e)
+
+
+def _run_manual_query(
+    bif_file: str,
+    competency: str,
+    score: float,
+    total: float,
+    student_id: str,
+    domain_id: int,
+) -> Tuple[Optional[Dict], Optional[str]]:
+    """Body of ``run_manual_query``, run inline or in a pool worker."""
+
     if not bif_file:
         return None, "Assessment is not linked to a Bayesian Network"
     if not competency:
@@ -67,14 +98,13 @@ def run_manual_query(
     }
 
     if ratio < 0.7:
-        outcome = determine_next_focus(model_data["model"], model_data["infer"], competency, student_id, domain_id, 0)
+        outcome = determine_next_focus(model_data["graph"], model_data["infer"], competency, student_id, domain_id, 0)
         result["next_focus"] = outcome.get("next_focus") if outcome else None
         result["mastery_probabilities"] = outcome.get("mastery_probabilities") if outcome else None
     else:
         # Competency is passed. Show the message for any node that is not a bottom-level (leaf) node.
-        model = model_data["model"]
-        children = model.get_children(competency)
-        if children:  # If it has children, it's not a bottom-level node.
+        graph = model_data["graph"]
+        if competency in graph.index and not graph.is_leaf(competency):  # If it has children, it's not a bottom-level node.
             result["next_focus"] = "Competency Passed. Consider focusing on a sibling or parent node."
 
     return result, None
@@ -1,6 +1,8 @@
 import sqlite3
 import textwrap
 
+from prerequisite.network_store import save_network_content
+
 DB_PATH = 'database.db'
 
 # --- Define valid, complete BIF content for ALL networks based on your files ---
@@ -324,21 +326,9 @@ def reset_selected_bifs(bif_names):
 
             clean_content = textwrap.dedent(VALID_BIF_TEMPLATES[bif_name])
 
-            cursor.execute("SELECT name FROM bayesian_networks WHERE name = ?", (bif_name,))
-            result = cursor.fetchone()
-            
-            if result:
-                cursor.execute(
-                    "UPDATE bayesian_networks SET content = ? WHERE name = ?",
-                    (clean_content, bif_name)
-                )
-                print(f"✅ Updated content for '{bif_name}'.")
-            else:
-                cursor.execute(
-                    "INSERT INTO bayesian_networks (name, content) VALUES (?, ?)",
-                    (bif_name, clean_content)
-                )
-                print(f"✅ Inserted new content for '{bif_name}'.")
+            # Updates or inserts the row and bumps its version so running workers reload it.
+            version = save_network_content(cursor, bif_name, clean_content)
+            print(f"✅ Saved content for '{bif_name}' (version {version}).")
 
         conn.commit()
         print("\n--- Selected BIF updates complete. ---")
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from database import get_db_connection
-from query_helpers import run_manual_query, run_auto_query
-from prerequisite.prerequisite_api import get_model # <-- Add this import
+from query_helpers import query_error_status, run_manual_query, run_auto_query
+from prerequisite.prerequisite_api import get_model, network_response # <-- Add this import
 import sqlite3 # <-- Add this import
 
 student_bp = Blueprint('student', __name__)
@@ -127,12 +127,7 @@ def get_student_network_structure():
     model_data = get_model(bif_file)
     if not model_data:
         return jsonify({'error': 'Network not found'}), 404
-    model = model_data['model']
-    structure = []
-    for node in model.nodes():
-        parents = list(model.get_parents(node))
-        structure.append({'node': node, 'parents': parents})
-    return jsonify(structure)
+    return network_response(model_data, "structure", lambda: jsonify(model_data['graph'].structure()))
 
 # --- END NEW ---
 
@@ -179,8 +174,7 @@ def student_manual_query():
 
     result, error = run_manual_query(bif_file, competency, score, total)
     if error:
-        lower_error = error.lower()
-        status = 404 if ('not found' in lower_error or 'not loaded' in lower_error) else 400
+        status = query_error_status(error)
         return jsonify({'error': error}), status
 
     return jsonify(result)
@@ -190,8 +184,7 @@ def student_manual_query():
 def student_auto_query(result_id):
     result, error = run_auto_query(result_id)
     if error:
-        lower_error = error.lower()
-        status = 404 if ('not found' in lower_error or 'not loaded' in lower_error) else 400
+        status = query_error_status(error)
         return jsonify({'error': error}), status
 
     return jsonify(result)
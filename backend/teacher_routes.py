@@ -2,8 +2,10 @@ from flask import Blueprint, request, jsonify, send_from_directory
 from pgmpy.readwrite.BIF import BIFReader
 from pgmpy.inference import VariableElimination
 # --- FIX: Import the get_model function instead of the cache dictionary ---
-from prerequisite.prerequisite_api import get_model
-from query_helpers import run_manual_query, run_auto_query
+from prerequisite.prerequisite_api import ADAPTIVE_ENGINE, get_model, inference_for, network_response
+from prerequisite.online_learning import ONLINE_LEARNING, record_submission
+from prerequisite.student_profile import fetch_cohort_evidence, infer_cohort, network_for_domain
+from query_helpers import query_error_status, run_manual_query, run_auto_query
 import sqlite3
 import os
 
@@ -734,8 +736,16 @@ def submit_assessment():
             "INSERT INTO student_results (student_id, assessment_id, score, total, attempt_number) VALUES (?, ?, ?, ?, ?)",
             (student_id, assessment_id, score, total_questions, new_attempt_number)
         )
+
         conn.commit()
 
+        # 4. Feed the saved result into the online CPD counts; a failure there never loses the result.
+        if ONLINE_LEARNING:
+            try:
+                record_submission(student_id, assessment_id, score, total_questions)
+            except Exception as e:
+                print(f"Could not record online CPD counts: {e}")
+
         return jsonify({'score': score, 'total': total_questions})
 
     except Exception as e:
@@ -1104,8 +1114,7 @@ def manual_query():
 
     result, error = run_manual_query(bif_file, competency, score, total, student_id, domain_id)
     if error:
-        lower_error = error.lower()
-        status = 404 if ('not found' in lower_error or 'not loaded' in lower_error) else 400
+        status = query_error_status(error)
         return jsonify({'error': error}), status
 
     return jsonify(result)
@@ -1117,14 +1126,42 @@ def auto_query_result(result_id):
     result, error = run_auto_query(result_id)
     print("[DEBUG] Auto query result:", result)
     if error:
-        lower_error = error.lower()
-        status = 404 if ('not found' in lower_error or 'not loaded' in lower_error) else 400
+        status = query_error_status(error)
         print("[DEBUG] Auto query error:", error)
         return jsonify({'error': error}), status
 
     return jsonify(result)
 
 
+@teacher_routes.route('/cohort-mastery', methods=['POST'])
+def cohort_mastery():
+    """Estimated mastery of many students in one domain, as a students × competencies matrix.
+
+    Body: {"domain_id": ..., "student_ids": [...] (optional, defaults to everyone with progress
+    in the domain), "bif_file": ... (optional, defaults to the domain's network)}.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    domain_id = data.get('domain_id')
+    student_ids = data.get('student_ids')
+    if not domain_id:
+        return jsonify({'error': 'Missing domain_id'}), 400
+    if student_ids is not None and not isinstance(student_ids, list):
+        return jsonify({'error': 'student_ids must be a list'}), 400
+
+    bif_file = data.get('bif_file') or network_for_domain(domain_id)
+    if not bif_file:
+        return jsonify({'error': f"Domain '{domain_id}' is not linked to a Bayesian Network"}), 404
+    model_data = get_model(bif_file)
+    if not model_data:
+        return jsonify({'error': f"BIF file '{bif_file}' not loaded"}), 404
+
+    evidence = fetch_cohort_evidence(domain_id, [str(s) for s in student_ids] if student_ids is not None else None)
+    result = infer_cohort(model_data, evidence, inference_for(model_data, ADAPTIVE_ENGINE))
+    return jsonify({'domain_id': domain_id, 'bif_file': bif_file, **result})
+
+
 @teacher_routes.route('/results/<student_id>', methods=['GET'])
 def get_teacher_student_results(student_id):
     conn = get_db()
@@ -1208,12 +1245,7 @@ def get_network_structure():
     model_data = get_model(bif_file)
     if not model_data:
         return jsonify({'error': 'Network not found'}), 404
-    model = model_data['model']
-    structure = []
-    for node in model.nodes():
-        parents = list(model.get_parents(node))
-        structure.append({'node': node, 'parents': parents})
-    return jsonify(structure)
+    return network_response(model_data, "structure", lambda: jsonify(model_data['graph'].structure()))
 
 
 